@@ -10,7 +10,7 @@ import os
 import warnings
 warnings.filterwarnings('ignore')
 from config import OUTPUT_DIRS, CURRENT_RANGE
-from data_config import get_data_path
+from data_config import load_etf
 
 def identify_starter_positions(df):
     """
@@ -18,176 +18,153 @@ def identify_starter_positions(df):
     """
     df = df.sort_values(['Bloomberg Name', 'Date'])
     
-    # Find first appearance of each stock
-    first_appearance = df.groupby('Bloomberg Name').first().reset_index()
+    # Entry and outcome info for every stock in one grouped pass
+    # ('first' skips NaN weights, as groupby().first() does for the selection)
+    history = df.groupby('Bloomberg Name', sort=False, observed=True).agg(
+        entry_date=('Date', 'min'),
+        first_weight=('Weight', 'first'),
+        max_weight=('Weight', 'max'),
+        final_date=('Date', 'max')
+    )
+    
+    # Weights on each stock's first and last rows, NaN included; groups come
+    # in order of first appearance, the same order as these rows
+    names = df['Bloomberg Name']
+    named = names.notna()  # groupby drops rows without a name
+    history['entry_weight'] = df['Weight'][named & ~names.duplicated()].to_numpy()
+    history['final_weight'] = df['Weight'][named & ~names.duplicated(keep='last')].to_numpy()
     
     # Starter positions are those that first appear in weight range
-    # Filter for positions that start in weight range
     if CURRENT_RANGE:
-        starters = first_appearance[(first_appearance['Weight'] >= CURRENT_RANGE['min']) & 
-                                   (first_appearance['Weight'] < CURRENT_RANGE['max'])][['Bloomberg Name']].copy()
+        starters = history[(history['first_weight'] >= CURRENT_RANGE['min']) & 
+                           (history['first_weight'] < CURRENT_RANGE['max'])]
     else:
-        starters = first_appearance[first_appearance['Weight'] < 1][['Bloomberg Name']].copy()
-    starters['Type'] = 'Starter'
-    
-    # Get detailed history for starter positions
-    starter_details = []
-    
-    # Process each starter ticker if any exist
-    if len(starters) > 0:
-        for ticker in starters['Bloomberg Name'].unique():
-            ticker_data = df[df['Bloomberg Name'] == ticker].copy()
-            
-            # Entry info
-            entry_date = ticker_data['Date'].min()
-            entry_weight = ticker_data['Weight'].iloc[0]
-            
-            # Track outcome
-            max_weight = ticker_data['Weight'].max()
-            final_weight = ticker_data['Weight'].iloc[-1]
-            final_date = ticker_data['Date'].max()
-            
-            # Determine outcome
-            threshold = CURRENT_RANGE['max'] if CURRENT_RANGE else 1
-            if max_weight >= threshold:
-                outcome = 'Graduated to Large'
-                days_to_outcome = (ticker_data[ticker_data['Weight'] >= threshold]['Date'].min() - entry_date).days
-            elif final_weight == 0 or pd.isna(final_weight):
-                outcome = 'Dropped'
-                # Find last non-zero date
-                non_zero = ticker_data[ticker_data['Weight'] > 0]
-                if len(non_zero) > 0:
-                    days_to_outcome = (non_zero['Date'].max() - entry_date).days
-                else:
-                    days_to_outcome = 0
-            else:
-                outcome = 'Still Small'
-                days_to_outcome = (final_date - entry_date).days
-            
-            starter_details.append({
-                'Bloomberg Name': ticker,
-                'Entry Date': entry_date,
-                'Entry Weight %': entry_weight,
-                'Max Weight Achieved %': max_weight,
-                'Final Weight %': final_weight,
-                'Outcome': outcome,
-                'Days to Outcome': days_to_outcome,
-                'Days as Small Position': days_to_outcome
-            })
+        starters = history[history['first_weight'] < 1]
     
     # Return DataFrame with proper columns even if empty
-    if len(starter_details) == 0:
+    if len(starters) == 0:
         return pd.DataFrame(columns=['Bloomberg Name', 'Entry Date', 'Entry Weight %', 
                                     'Max Weight Achieved %', 'Final Weight %', 'Outcome', 
                                     'Days to Outcome', 'Days as Small Position'])
-    else:
-        return pd.DataFrame(starter_details)
+    
+    # Dates that end the small-position period (NaT where never reached)
+    threshold = CURRENT_RANGE['max'] if CURRENT_RANGE else 1
+    first_large_date = df['Date'].where(df['Weight'] >= threshold).groupby(names, sort=False, observed=True).min()
+    last_nonzero_date = df['Date'].where(df['Weight'] > 0).groupby(names, sort=False, observed=True).max()
+    
+    # Determine outcome
+    graduated = starters['max_weight'] >= threshold
+    dropped = ~graduated & ((starters['final_weight'] == 0) | starters['final_weight'].isna())
+    outcome = np.select([graduated, dropped], ['Graduated to Large', 'Dropped'], 'Still Small')
+    
+    outcome_date = starters['final_date'].where(
+        ~dropped, last_nonzero_date.reindex(starters.index).fillna(starters['entry_date']))
+    outcome_date = outcome_date.where(~graduated, first_large_date.reindex(starters.index))
+    days_to_outcome = (outcome_date - starters['entry_date']).dt.days
+    
+    return pd.DataFrame({
+        'Bloomberg Name': starters.index,
+        'Entry Date': starters['entry_date'].to_numpy(),
+        'Entry Weight %': starters['entry_weight'].to_numpy(),
+        'Max Weight Achieved %': starters['max_weight'].to_numpy(),
+        'Final Weight %': starters['final_weight'].to_numpy(),
+        'Outcome': outcome,
+        'Days to Outcome': days_to_outcome.to_numpy(),
+        'Days as Small Position': days_to_outcome.to_numpy()
+    })
 
 def identify_residual_positions(df):
     """
     Identify residual positions: stocks that fell into weight range
     """
-    df = df.sort_values(['Bloomberg Name', 'Date'])
+    df = df.sort_values(['Bloomberg Name', 'Date']).reset_index(drop=True)
+    names = df['Bloomberg Name']
+    weights = df['Weight']
+    g = df.groupby('Bloomberg Name', sort=False, observed=True)
+    
+    # Find transitions into weight range
+    threshold = CURRENT_RANGE['max'] if CURRENT_RANGE else 1
+    if CURRENT_RANGE:
+        is_small = (weights >= CURRENT_RANGE['min']) & (weights < CURRENT_RANGE['max'])
+    else:
+        is_small = weights < 1
+    was_large = g['Weight'].shift(1) >= threshold
+    transition = was_large & is_small
     
-    residual_details = []
-    
-    for ticker in df['Bloomberg Name'].unique():
-        ticker_data = df[df['Bloomberg Name'] == ticker].copy()
-        ticker_data = ticker_data.sort_values('Date')
-        
-        # Find transitions into weight range
-        if CURRENT_RANGE:
-            ticker_data['Was_Large'] = ticker_data['Weight'].shift(1) >= CURRENT_RANGE['max']
-            ticker_data['Is_Small'] = (ticker_data['Weight'] >= CURRENT_RANGE['min']) & (ticker_data['Weight'] < CURRENT_RANGE['max'])
-        else:
-            ticker_data['Was_Large'] = ticker_data['Weight'].shift(1) >= 1
-            ticker_data['Is_Small'] = ticker_data['Weight'] < 1
-        ticker_data['Transition'] = ticker_data['Was_Large'] & ticker_data['Is_Small']
-        
-        transitions = ticker_data[ticker_data['Transition']]
-        
-        for _, trans in transitions.iterrows():
-            # Get history before and after transition
-            trans_date = trans['Date']
-            before = ticker_data[ticker_data['Date'] < trans_date]
-            after = ticker_data[ticker_data['Date'] >= trans_date]
-            
-            if len(before) > 0 and len(after) > 0:
-                # Peak weight before falling
-                peak_weight = before['Weight'].max()
-                
-                # Weight at transition
-                trans_weight = trans['Weight']
-                
-                # Track outcome after becoming residual
-                future_max = after['Weight'].max()
-                final_weight = after['Weight'].iloc[-1]
-                
-                # Determine outcome
-                threshold = CURRENT_RANGE['max'] if CURRENT_RANGE else 1
-                if future_max >= threshold:
-                    outcome = 'Recovered to Large'
-                    recovery_date = after[after['Weight'] >= threshold]['Date'].min()
-                    days_as_residual = (recovery_date - trans_date).days
-                elif final_weight == 0 or pd.isna(final_weight):
-                    outcome = 'Dropped'
-                    last_date = after[after['Weight'] > 0]['Date'].max() if len(after[after['Weight'] > 0]) > 0 else trans_date
-                    days_as_residual = (last_date - trans_date).days
-                else:
-                    outcome = 'Still Residual'
-                    days_as_residual = (after['Date'].max() - trans_date).days
-                
-                residual_details.append({
-                    'Bloomberg Name': ticker,
-                    'Transition Date': trans_date,
-                    'Peak Weight Before %': peak_weight,
-                    'Weight at Transition %': trans_weight,
-                    'Weight Drawdown %': peak_weight - trans_weight,
-                    'Max Weight After %': future_max,
-                    'Final Weight %': final_weight,
-                    'Outcome': outcome,
-                    'Days as Residual': days_as_residual
-                })
+    # History before and after each row, computed for all tickers at once
+    peak_before = g['Weight'].cummax().groupby(names, sort=False, observed=True).shift(1)
+    future_max = weights[::-1].groupby(names[::-1], sort=False, observed=True).cummax()[::-1]
+    recovery_date = df['Date'].where(weights >= threshold).groupby(names, sort=False, observed=True).bfill()
     
-    # Return DataFrame with proper columns even if empty
-    if len(residual_details) == 0:
+    # Rows repeating an earlier row's date share that row's before/after split
+    block_start = ~df.duplicated(['Bloomberg Name', 'Date'])
+    start_pos = np.maximum.accumulate(np.where(block_start, np.arange(len(df)), 0))
+    peak_before = pd.Series(peak_before.to_numpy()[start_pos])
+    future_max = pd.Series(future_max.to_numpy()[start_pos])
+    recovery_date = pd.Series(recovery_date.to_numpy()[start_pos])
+    
+    # Per-ticker final state
+    is_last = ~names.duplicated(keep='last')
+    final_weight = weights.where(is_last).groupby(names, sort=False, observed=True).bfill()
+    final_date = g['Date'].transform('max')
+    last_nonzero_date = df['Date'].where(weights > 0).groupby(names, sort=False, observed=True).transform('max')
+    
+    # Need at least one earlier date to measure the peak before falling
+    mask = (transition & peak_before.notna()).to_numpy()
+    if not mask.any():
         return pd.DataFrame(columns=['Bloomberg Name', 'Transition Date', 'Peak Weight Before %',
                                     'Weight at Transition %', 'Weight Drawdown %', 'Max Weight After %',
                                     'Final Weight %', 'Outcome', 'Days as Residual'])
-    else:
-        return pd.DataFrame(residual_details)
+    
+    trans = df[mask].reset_index(drop=True)
+    trans_date = trans['Date']
+    peak_weight = peak_before[mask].reset_index(drop=True)
+    future_max = future_max[mask].reset_index(drop=True)
+    final_weight = final_weight[mask].reset_index(drop=True)
+    
+    # Determine outcome
+    recovered = future_max >= threshold
+    dropped = ~recovered & ((final_weight == 0) | final_weight.isna())
+    outcome = np.select([recovered, dropped], ['Recovered to Large', 'Dropped'], 'Still Residual')
+    
+    last_date = last_nonzero_date[mask].reset_index(drop=True)
+    last_date = last_date.where(last_date >= trans_date, trans_date)
+    outcome_date = final_date[mask].reset_index(drop=True)
+    outcome_date = outcome_date.where(~dropped, last_date)
+    outcome_date = outcome_date.where(~recovered, recovery_date[mask].reset_index(drop=True))
+    
+    return pd.DataFrame({
+        'Bloomberg Name': trans['Bloomberg Name'],
+        'Transition Date': trans_date,
+        'Peak Weight Before %': peak_weight,
+        'Weight at Transition %': trans['Weight'],
+        'Weight Drawdown %': peak_weight - trans['Weight'],
+        'Max Weight After %': future_max,
+        'Final Weight %': final_weight,
+        'Outcome': outcome,
+        'Days as Residual': (outcome_date - trans_date).dt.days
+    })
 
 def identify_reappeared_positions(df):
     """
     Identify positions that left and came back
     """
     df = df.sort_values(['Bloomberg Name', 'Date'])
+    g = df.groupby('Bloomberg Name', sort=False, observed=True)['Date']
     
-    reappeared = []
-    
-    for ticker in df['Bloomberg Name'].unique():
-        ticker_data = df[df['Bloomberg Name'] == ticker].copy()
-        ticker_data = ticker_data.sort_values('Date')
-        
-        # Find gaps in holdings (weight = 0 or missing dates)
-        ticker_data['Date_Diff'] = ticker_data['Date'].diff().dt.days
-        
-        # Find reappearances (gap > 30 days)
-        gaps = ticker_data[ticker_data['Date_Diff'] > 30]
-        
-        for _, gap in gaps.iterrows():
-            gap_date = gap['Date']
-            before_gap = ticker_data[ticker_data['Date'] < gap_date]['Date'].max()
-            
-            reappeared.append({
-                'Bloomberg Name': ticker,
-                'Exit Date': before_gap,
-                'Re-entry Date': gap_date,
-                'Days Absent': gap['Date_Diff'],
-                'Re-entry Weight %': gap['Weight']
-            })
-    
-    return pd.DataFrame(reappeared)
+    # Find gaps in holdings (weight = 0 or missing dates)
+    df['Date_Diff'] = g.diff().dt.days
+    df['Prev_Date'] = g.shift(1)
+    
+    # Find reappearances (gap > 30 days)
+    gaps = df[df['Date_Diff'] > 30]
+    
+    return gaps.rename(columns={
+        'Prev_Date': 'Exit Date',
+        'Date': 'Re-entry Date',
+        'Date_Diff': 'Days Absent',
+        'Weight': 'Re-entry Weight %'
+    })[['Bloomberg Name', 'Exit Date', 'Re-entry Date', 'Days Absent', 'Re-entry Weight %']].reset_index(drop=True)
 
 def analyze_etf(etf_name):
     """
@@ -195,11 +172,7 @@ def analyze_etf(etf_name):
     """
     
     # Load data
-    df = pd.read_excel(get_data_path(etf_name), sheet_name='Sheet1')
-    df['Date'] = pd.to_datetime(df['Date'])
-    
-    # Convert Weight from decimal to percentage (0.04 -> 4.0)
-    df['Weight'] = df['Weight'] * 100
+    df = load_etf(etf_name)
     
     # Run analyses
     starters = identify_starter_positions(df)
@@ -227,7 +200,7 @@ def analyze_etf(etf_name):
     
     # Save results to starter folder
     output_file = f"{OUTPUT_DIRS['starter']}/{etf_name}_starter_residual_analysis.xlsx"
-    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+    with pd.ExcelWriter(output_file, engine='xlsxwriter') as writer:
         summary.to_excel(writer, sheet_name='Summary', index=False)
         starters.to_excel(writer, sheet_name='Starter_Positions', index=False)
         residuals.to_excel(writer, sheet_name='Residual_Positions', index=False)
@@ -250,24 +223,32 @@ def run():
     # Combine summaries
     combined_summary = pd.concat(all_summaries, ignore_index=True)
     
-    # Add totals row
-    totals = pd.DataFrame([{
-        'ETF': 'TOTAL',
-        'Total Starter Positions': combined_summary['Total Starter Positions'].sum(),
-        f'Graduated to >{CURRENT_RANGE["max"] if CURRENT_RANGE else "1"}%': combined_summary[f'Graduated to >{CURRENT_RANGE["max"] if CURRENT_RANGE else "1"}%'].sum(),
-        'Still in Range': combined_summary['Still in Range'].sum(),
-        'Dropped': combined_summary['Dropped'].sum(),
-        'Starter Success Rate %': combined_summary[f'Graduated to >{CURRENT_RANGE["max"] if CURRENT_RANGE else "1"}%'].sum() / combined_summary['Total Starter Positions'].sum() * 100,
-        'Avg Days as Starter': combined_summary['Avg Days as Starter'].mean(),
-        'Total Residual Positions': combined_summary['Total Residual Positions'].sum(),
-        f'Recovered to >{CURRENT_RANGE["max"] if CURRENT_RANGE else "1"}%': combined_summary[f'Recovered to >{CURRENT_RANGE["max"] if CURRENT_RANGE else "1"}%'].sum(),
-        'Still Residual': combined_summary['Still Residual'].sum(),
-        'Residual Dropped': combined_summary['Residual Dropped'].sum(),
-        'Residual Recovery Rate %': combined_summary[f'Recovered to >{CURRENT_RANGE["max"] if CURRENT_RANGE else "1"}%'].sum() / combined_summary['Total Residual Positions'].sum() * 100,
-        'Avg Days as Residual': combined_summary['Avg Days as Residual'].mean(),
-        'Total Reappeared': combined_summary['Total Reappeared'].sum(),
-        'Avg Days Absent': combined_summary['Avg Days Absent'].mean()
-    }])
+    max_label = CURRENT_RANGE["max"] if CURRENT_RANGE else "1"
+    graduated_col = f'Graduated to >{max_label}%'
+    recovered_col = f'Recovered to >{max_label}%'
+    
+    # Add totals row: sum the counts and average the day columns in one pass
+    agg_spec = {
+        'Total Starter Positions': 'sum',
+        graduated_col: 'sum',
+        'Still in Range': 'sum',
+        'Dropped': 'sum',
+        'Avg Days as Starter': 'mean',
+        'Total Residual Positions': 'sum',
+        recovered_col: 'sum',
+        'Still Residual': 'sum',
+        'Residual Dropped': 'sum',
+        'Avg Days as Residual': 'mean',
+        'Total Reappeared': 'sum',
+        'Avg Days Absent': 'mean'
+    }
+    totals = combined_summary.agg(agg_spec).to_frame().T
+    totals = totals.astype({col: 'int64' for col, how in agg_spec.items() if how == 'sum'})
+    totals['ETF'] = 'TOTAL'
+    
+    # Rates come from the summed counts, not from averaging the per-ETF rates
+    totals['Starter Success Rate %'] = totals[graduated_col] / totals['Total Starter Positions'] * 100
+    totals['Residual Recovery Rate %'] = totals[recovered_col] / totals['Total Residual Positions'] * 100
     
     combined_summary = pd.concat([combined_summary, totals], ignore_index=True)
     
@@ -6,17 +6,13 @@ import os
 import warnings
 warnings.filterwarnings('ignore')
 from config import OUTPUT_DIRS, CURRENT_RANGE
-from data_config import get_data_path
+from data_config import load_etf, shift_within_ticker
 
-def calculate_stock_pnl(file_path, etf_name):
+def calculate_stock_pnl(etf_name):
     """Calculate P&L contribution by individual stocks for positions in weight range"""
     
     # Read data
-    df = pd.read_excel(file_path)
-    df['Date'] = pd.to_datetime(df['Date'])
-    
-    # Convert Weight from decimal to percentage (0.04 -> 4.0)
-    df['Weight'] = df['Weight'] * 100
+    df = load_etf(etf_name)
     
     # Filter out rows with zero or invalid prices
     df = df[(df['Stock_Price'] > 0) & (df['Stock_Price'].notna())]
@@ -25,40 +21,42 @@ def calculate_stock_pnl(file_path, etf_name):
     df = df.sort_values(['Bloomberg Name', 'Date'])
     
     # Calculate daily P&L for each position using value-based method
-    df['Prev_Position'] = df.groupby('Bloomberg Name')['Position'].shift(1)
-    df['Prev_Price'] = df.groupby('Bloomberg Name')['Stock_Price'].shift(1)
-    df['Yesterday_Value'] = df['Prev_Position'] * df['Prev_Price']
-    df['Today_Value'] = df['Prev_Position'] * df['Stock_Price']
-    df['Daily_PnL'] = df['Today_Value'] - df['Yesterday_Value']
+    prev_position = shift_within_ticker(df, 'Position')
+    prev_price = shift_within_ticker(df, 'Stock_Price')
+    df['Daily_PnL'] = prev_position * (df['Stock_Price'].to_numpy() - prev_price)
     
     # Filter for positions in weight range only
     # Filter for positions in current weight range
     if CURRENT_RANGE:
         df_small = df[(df['Weight'] >= CURRENT_RANGE['min']) & 
-                     (df['Weight'] < CURRENT_RANGE['max'])].copy()
+                     (df['Weight'] < CURRENT_RANGE['max'])]
     else:
-        df_small = df[df['Weight'] < 1].copy()
+        df_small = df[df['Weight'] < 1]
     
-    # Remove extreme P&L outliers
-    pnl_threshold = df_small['Daily_PnL'].abs().quantile(0.999)
-    df_small = df_small[df_small['Daily_PnL'].abs() <= pnl_threshold]
+    # Remove extreme P&L outliers (np.quantile selects by partition, not a full sort)
+    abs_pnl = np.abs(df_small['Daily_PnL'].to_numpy())
+    valid_pnl = abs_pnl[~np.isnan(abs_pnl)]
+    pnl_threshold = np.quantile(valid_pnl, 0.999) if valid_pnl.size else np.nan
+    df_small = df_small[abs_pnl <= pnl_threshold]
     
     # Get company names - use the most recent company name for each Bloomberg Name
-    company_names = df_small.groupby('Bloomberg Name')['Company_Name'].last().to_dict()
+    company_names = (df_small.dropna(subset=['Company_Name'])
+                     .drop_duplicates('Bloomberg Name', keep='last')
+                     .set_index('Bloomberg Name')['Company_Name'])
     
     # Aggregate P&L by stock
-    stock_pnl = df_small.groupby('Bloomberg Name')['Daily_PnL'].sum().reset_index()
+    stock_pnl = df_small.groupby('Bloomberg Name', observed=True)['Daily_PnL'].sum().reset_index()
     stock_pnl.columns = ['Bloomberg_Name', 'Total_PnL']
     
     # Add company names
-    stock_pnl['Stock'] = stock_pnl['Bloomberg_Name'].map(company_names)
+    stock_pnl['Stock'] = stock_pnl['Bloomberg_Name'].astype(str).map(company_names)
     # Use Bloomberg Name if Company name is missing or NaN
     stock_pnl['Stock'] = stock_pnl['Stock'].fillna(stock_pnl['Bloomberg_Name'])
     # Clean up any NaN values
     stock_pnl['Stock'] = stock_pnl['Stock'].astype(str).replace('nan', '')
     
     # Filter only losses (negative P&L)
-    stock_pnl = stock_pnl[stock_pnl['Total_PnL'] < 0].copy()
+    stock_pnl = stock_pnl[stock_pnl['Total_PnL'] < 0]
     
     # Sort by P&L (most negative first)
     stock_pnl = stock_pnl[['Stock', 'Total_PnL']].sort_values('Total_PnL')
@@ -106,20 +104,13 @@ def create_pnl_pie_chart(stock_pnl, etf_name):
     }
     
     # Generate red gradient for losses with better contrast
+    # Create a wider range of red shades from dark to very light
+    # Start from dark red (0.4, 0.0, 0.0) to light pink (1.0, 0.8, 0.8)
     num_slices = len(chart_data)
-    colors = []
-    for i in range(num_slices):
-        # Create a wider range of red shades from dark to very light
-        # Start from dark red (0.4, 0.0, 0.0) to light pink (1.0, 0.8, 0.8)
-        progress = i / max(num_slices-1, 1)
-        
-        # Red channel: stays high
-        r = 0.4 + (0.6 * progress)
-        # Green and blue channels: increase more for lighter shades
-        g = 0.0 + (0.8 * progress)
-        b = 0.0 + (0.8 * progress)
-        
-        colors.append((r, g, b))
+    progress = np.linspace(0.0, 1.0, num_slices)
+    
+    # Red channel stays high; green and blue increase for lighter shades
+    colors = np.column_stack([0.4 + 0.6 * progress, 0.8 * progress, 0.8 * progress])
     
     # Create figure
     fig, ax = plt.subplots(figsize=(10, 10))
@@ -168,10 +159,8 @@ def main():
     
     # Create individual charts
     for etf in etfs:
-        file_path = get_data_path(etf)
-        
         # Calculate stock P&L
-        stock_pnl = calculate_stock_pnl(file_path, etf)
+        stock_pnl = calculate_stock_pnl(etf)
         
         # Create pie chart
         output_file = create_pnl_pie_chart(stock_pnl, etf)
@@ -6,8 +6,8 @@ Shows the market value and percentage of AUM allocated to positions in weight ra
 import pandas as pd
 import numpy as np
 import os
-from config import CURRENT_RANGE, set_current_range, WEIGHT_RANGES, create_directories
-from data_config import get_data_path
+from config import CURRENT_RANGE, set_current_range, WEIGHT_RANGES, create_directories, RANGE_LABELS, RANGE_EDGES
+from data_config import load_etf, get_cache_path
 
 # Initialize configuration if not already set
 if CURRENT_RANGE is None:
@@ -17,96 +17,91 @@ if CURRENT_RANGE is None:
 # Import OUTPUT_DIRS after initialization
 from config import OUTPUT_DIRS
 
-def calculate_weekly_market_value(etf_name):
-    """Calculate the weekly aggregated market value of positions in weight range"""
+# Bucket edges for the by-range breakdown, as an array for searchsorted
+_RANGE_EDGES = np.array(RANGE_EDGES, dtype=np.float64)
+
+def _week_start(dates):
+    """Monday starting each date's week (the same weeks as dt.to_period('W'))"""
     
-    df = pd.read_excel(get_data_path(etf_name), sheet_name='Sheet1')
-    df['Date'] = pd.to_datetime(df['Date'])
+    # Integer day numbers; 1970-01-01 was a Thursday, so (day + 3) % 7 is the weekday
+    days = dates.to_numpy().astype('datetime64[D]')
+    week_start = days - (days.view('int64') + 3) % 7
     
-    # Convert Weight from decimal to percentage (0.04 -> 4.0)
-    df['Weight'] = df['Weight'] * 100
+    return pd.Series(week_start.astype(dates.dtype), index=dates.index)
+
+def calculate_weekly_market_value(etf_name):
+    """Calculate the weekly aggregated market value of positions in weight range"""
     
-    # Add week identifier
-    df['Week'] = df['Date'].dt.to_period('W')
+    df = load_etf(etf_name, columns=['Date', 'Weight', 'Market Value'])
     
-    # Separate positions in weight range
-    df_small = df[(df['Weight'] >= CURRENT_RANGE['min']) & (df['Weight'] < CURRENT_RANGE['max'])] if CURRENT_RANGE else df[df['Weight'] < 1].copy()
+    # Add week identifier (start-of-week date)
+    df['Week'] = _week_start(df['Date'])
     
-    # Calculate weekly total for positions in weight range (sum across all days in the week)
-    weekly_small = df_small.groupby('Week').agg({
-        'Market Value': 'sum'
-    }).reset_index()
-    weekly_small.columns = ['Week', 'Small_MV_Total']
+    # Flag positions in weight range
+    if CURRENT_RANGE:
+        df['In_Range'] = (df['Weight'] >= CURRENT_RANGE['min']) & (df['Weight'] < CURRENT_RANGE['max'])
+    else:
+        df['In_Range'] = df['Weight'] < 1
+    df['Small_MV'] = df['Market Value'].where(df['In_Range'], 0.0)
     
-    # Calculate weekly total for all positions (sum across all days in the week)
-    weekly_all = df.groupby('Week').agg({
-        'Market Value': 'sum'
-    }).reset_index()
-    weekly_all.columns = ['Week', 'Total_MV']
+    # Weekly totals for positions in weight range and for all positions
+    # (sum across all days in the week), in one pass
+    weekly_data = df.groupby('Week', sort=False).agg(
+        Small_MV_Total=('Small_MV', 'sum'),
+        Total_MV=('Market Value', 'sum'),
+        Has_Small=('In_Range', 'any')
+    ).reset_index()
     
-    # Merge the data
-    weekly_data = weekly_small.merge(weekly_all, on='Week', how='left')
+    # Only keep weeks that had positions in weight range
+    weekly_data = weekly_data[weekly_data['Has_Small']]
     
     # Calculate percentage
     weekly_data['Small_MV_Pct'] = (weekly_data['Small_MV_Total'] / weekly_data['Total_MV']) * 100
     
-    # Convert Week back to datetime (use start of week)
-    weekly_data['Date'] = weekly_data['Week'].dt.to_timestamp()
+    # Week is already the start-of-week date
+    weekly_data['Date'] = weekly_data['Week']
     
-    # Sort by date
-    weekly_data = weekly_data.sort_values('Date')
+    # Already in date order: load_etf sorts by Date and the groupbys keep that order
     
     return weekly_data[['Date', 'Small_MV_Total', 'Total_MV', 'Small_MV_Pct']]
 
 def calculate_weekly_market_value_by_range(etf_name):
     """Calculate the weekly aggregated market value for all weight ranges"""
     
-    df = pd.read_excel(get_data_path(etf_name), sheet_name='Sheet1')
-    df['Date'] = pd.to_datetime(df['Date'])
+    df = load_etf(etf_name, columns=['Date', 'Weight', 'Market Value'])
     
-    # Convert Weight from decimal to percentage (0.04 -> 4.0)
-    df['Weight'] = df['Weight'] * 100
+    # Add week identifier (start-of-week date)
+    df['Week'] = _week_start(df['Date'])
     
-    # Add week identifier
-    df['Week'] = df['Date'].dt.to_period('W')
+    # Bucket id per row in one searchsorted pass; ids outside 0-4 (weight below 0%,
+    # at or above 100%, or missing) fall outside every range and are left out
+    bucket = np.searchsorted(_RANGE_EDGES, df['Weight'].to_numpy(), side='right').astype(np.int8) - 1
+    in_any_range = (bucket >= 0) & (bucket < len(RANGE_LABELS))
     
-    # Define weight ranges
-    weight_ranges = {
-        '<1%': (0, 1),
-        '1-2.5%': (1, 2.5),
-        '2.5-5%': (2.5, 5),
-        '5-7.5%': (5, 7.5),
-        '>7.5%': (7.5, 100)
-    }
+    # Total market value for each week
+    total_mv = df.groupby('Week', sort=False)['Market Value'].sum()
     
-    # Calculate market value for each weight range
-    weekly_results = []
+    # Market value for each weight range, and its share of the weekly total
+    ranged = df.loc[in_any_range, ['Week', 'Market Value']].assign(bucket=bucket[in_any_range])
+    range_mv = ranged.groupby(['Week', 'bucket'], sort=False)['Market Value'].sum().unstack(fill_value=0)
+    range_mv = range_mv.reindex(columns=range(len(RANGE_LABELS)), fill_value=0)
+    range_mv.columns = RANGE_LABELS
+    range_mv = range_mv.reindex(total_mv.index, fill_value=0)
+    range_pct = range_mv.div(total_mv, axis=0) * 100
+    range_pct[total_mv <= 0] = 0
     
-    for week in df['Week'].unique():
-        week_data = df[df['Week'] == week]
-        week_result = {'Week': week}
-        
-        # Total market value for the week
-        total_mv = week_data['Market Value'].sum()
-        week_result['Total_MV'] = total_mv
-        
-        # Market value for each weight range
-        for range_name, (min_weight, max_weight) in weight_ranges.items():
-            range_data = week_data[(week_data['Weight'] >= min_weight) & (week_data['Weight'] < max_weight)]
-            range_mv = range_data['Market Value'].sum()
-            week_result[f'MV_{range_name}'] = range_mv
-            week_result[f'MV_Pct_{range_name}'] = (range_mv / total_mv * 100) if total_mv > 0 else 0
-        
-        weekly_results.append(week_result)
+    weekly_data = pd.DataFrame({'Total_MV': total_mv})
+    for range_name in RANGE_LABELS:
+        weekly_data[f'MV_{range_name}'] = range_mv[range_name]
+        weekly_data[f'MV_Pct_{range_name}'] = range_pct[range_name]
+    weekly_data = weekly_data.reset_index()
     
-    # Convert to DataFrame
-    weekly_data = pd.DataFrame(weekly_results)
+    # Week is already the start-of-week date; label it as the Monday/Sunday span
+    weekly_data['Date'] = weekly_data['Week']
+    week_end = weekly_data['Date'] + pd.Timedelta(days=6)
+    weekly_data['Week'] = weekly_data['Date'].dt.strftime('%Y-%m-%d') + '/' + week_end.dt.strftime('%Y-%m-%d')
     
-    # Convert Week back to datetime (use start of week)
-    weekly_data['Date'] = weekly_data['Week'].dt.to_timestamp()
-    
-    # Sort by date
-    weekly_data = weekly_data.sort_values('Date')
+    # Already in date order: load_etf sorts by Date and the groupbys keep that order
     
     return weekly_data
 
@@ -133,34 +128,34 @@ def save_market_value_data():
     output_filename = f"{folder_suffix}_Market_Value_Data.xlsx"
     output_path = f"{OUTPUT_DIRS['market_value']}/{output_filename}"
     
-    with pd.ExcelWriter(output_path) as writer:
+    with pd.ExcelWriter(output_path, engine='xlsxwriter') as writer:
         for etf in etfs:
-            data = all_data[etf].copy()
-            data.to_excel(writer, sheet_name=etf, index=False)
+            all_data[etf].to_excel(writer, sheet_name=etf, index=False)
             
             # Save range data
-            range_data = all_range_data[etf].copy()
-            range_data.to_excel(writer, sheet_name=f'{etf}_Ranges', index=False)
+            all_range_data[etf].to_excel(writer, sheet_name=f'{etf}_Ranges', index=False)
         
-        # Create summary sheet
-        summary_data = []
-        for etf in etfs:
-            data = all_data[etf]
-            summary_data.append({
-                'ETF': etf,
-                'Latest_Date': data['Date'].max(),
-                'Latest_Small_MV': data.iloc[-1]['Small_MV_Total'],
-                'Latest_Total_MV': data.iloc[-1]['Total_MV'],
-                'Latest_Small_MV_Pct': data.iloc[-1]['Small_MV_Pct'],
-                'Avg_Small_MV': data['Small_MV_Total'].mean(),
-                'Avg_Small_MV_Pct': data['Small_MV_Pct'].mean(),
-                'Max_Small_MV': data['Small_MV_Total'].max(),
-                'Min_Small_MV': data['Small_MV_Total'].min()
-            })
+        # Create summary sheet: one groupby-agg across all ETFs plus each ETF's latest row
+        summary_df = pd.DataFrame()
+        if all_data:
+            by_etf = pd.concat(all_data, names=['ETF']).reset_index(level=0).groupby('ETF', sort=False)
+            latest = by_etf.tail(1).set_index('ETF')
+            summary_df = by_etf.agg(
+                Latest_Date=('Date', 'max'),
+                Avg_Small_MV=('Small_MV_Total', 'mean'),
+                Avg_Small_MV_Pct=('Small_MV_Pct', 'mean'),
+                Max_Small_MV=('Small_MV_Total', 'max'),
+                Min_Small_MV=('Small_MV_Total', 'min')
+            )
+            summary_df.insert(1, 'Latest_Small_MV', latest['Small_MV_Total'])
+            summary_df.insert(2, 'Latest_Total_MV', latest['Total_MV'])
+            summary_df.insert(3, 'Latest_Small_MV_Pct', latest['Small_MV_Pct'])
+            summary_df = summary_df.reset_index()
         
-        summary_df = pd.DataFrame(summary_data)
         summary_df.to_excel(writer, sheet_name='Summary', index=False)
     
+    # Keep a pickled copy so the plotting step (2.3) can skip re-parsing the workbook
+    pd.to_pickle((all_data, all_range_data), get_cache_path(f"{'_'.join(etfs)}_{output_filename}.pkl"))
     
     return all_data, all_range_data
 
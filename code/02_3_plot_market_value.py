@@ -1,15 +1,18 @@
 """
 Plot market value charts from calculated data
-Reads data from Market_Value_Data.xlsx and creates visualizations
+Uses the data from step 2.2 (in memory, or its saved copy) and creates visualizations
 """
 
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # Charts are only saved to disk, never shown
 import matplotlib.pyplot as plt
 import os
 import warnings
 warnings.filterwarnings('ignore')
-from config import CURRENT_RANGE, format_value, set_current_range, WEIGHT_RANGES, create_directories
+from config import CURRENT_RANGE, format_value, downsample, set_current_range, WEIGHT_RANGES, create_directories, ensure_datetime, RANGE_LABELS
+from data_config import get_cache_path
 
 # Initialize configuration if not already set
 if CURRENT_RANGE is None:
@@ -19,8 +22,37 @@ if CURRENT_RANGE is None:
 # Import OUTPUT_DIRS after initialization
 from config import OUTPUT_DIRS
 
+def load_market_value_data(etfs, input_file):
+    """
+    Load the weekly and per-range market value data written by step 2.2,
+    using its pickled copy when that is at least as new as the workbook
+    """
+    
+    cache_file = get_cache_path(f"{'_'.join(etfs)}_{os.path.basename(input_file)}.pkl")
+    if cache_file.exists() and cache_file.stat().st_mtime >= os.path.getmtime(input_file):
+        try:
+            return pd.read_pickle(cache_file)
+        except Exception:
+            pass  # Unreadable copy, fall back to the workbook
+    
+    # Parse the workbook once for all the sheets we need
+    sheets = pd.read_excel(input_file, sheet_name=[name for etf in etfs for name in (etf, f'{etf}_Ranges')])
+    all_data = {}
+    all_range_data = {}
+    for etf in etfs:
+        all_data[etf] = sheets[etf]
+        all_range_data[etf] = sheets[f'{etf}_Ranges']
+        all_data[etf]['Date'] = ensure_datetime(all_data[etf]['Date'])
+        all_range_data[etf]['Date'] = ensure_datetime(all_range_data[etf]['Date'])
+    
+    return all_data, all_range_data
+
 def plot_market_value_charts():
-    """Create market value charts from saved Excel data"""
+    """Create market value charts from the data step 2.2 saved"""
+    
+    from config import get_selected_etfs
+    etfs = get_selected_etfs()
+    colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd']
     
     # Load data
     folder_suffix = CURRENT_RANGE['folder'] if CURRENT_RANGE else 'under_1pct'
@@ -31,21 +63,20 @@ def plot_market_value_charts():
         print("   Please run step 2.2 first to calculate market value data")
         return
     
-    from config import get_selected_etfs
-    etfs = get_selected_etfs()
-    colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd']
+    all_data, all_range_data = load_market_value_data(etfs, input_file)
     
-    # Read data for each ETF
+    # Plot data for each ETF, drawing each chart on the same figure
+    fig = plt.figure(figsize=(12, 6), layout='tight')
+    stacked_fig = plt.figure(figsize=(14, 8), layout='tight')
     for i, etf in enumerate(etfs):
-        
-        # Read ETF sheet
-        weekly_data = pd.read_excel(input_file, sheet_name=etf)
-        weekly_data['Date'] = pd.to_datetime(weekly_data['Date'])
+        weekly_data = all_data[etf]
         
         # Rename columns for compatibility
         weekly_data.columns = ['Date', 'Small_MV_Total', 'Total_MV', 'Small_MV_Pct']
+        weekly_data = downsample(weekly_data)
         
-        fig, ax = plt.subplots(figsize=(12, 6))
+        fig.clf()
+        ax = fig.add_subplot(111)
         
         # Create dual axis
         ax2 = ax.twinx()
@@ -87,31 +118,37 @@ def plot_market_value_charts():
         labels = [l.get_label() for l in lines]
         ax.legend(lines, labels, loc='best', fontsize=13)
         
-        plt.tight_layout()
-        
         # Save chart
         output_file = f"{OUTPUT_DIRS['market_value']}/{etf}_Market_Value_Chart.png"
-        plt.savefig(output_file, dpi=300, bbox_inches='tight')
-        plt.close()
+        fig.savefig(output_file, dpi=150)
         
         # Create stacked market value percentage chart
-        create_stacked_mv_percentage_chart(etf, input_file)
+        create_stacked_mv_percentage_chart(etf, all_range_data[etf], stacked_fig)
+    plt.close(fig)
+    plt.close(stacked_fig)
     
     print("✅ Market value charts created")
 
-def create_stacked_mv_percentage_chart(etf, input_file):
-    """Create a stacked area chart showing market value percentage distribution by weight range"""
+def create_stacked_mv_percentage_chart(etf, range_data, fig=None):
+    """Create a stacked area chart showing market value percentage distribution by weight range
+
+    Draws on fig when given (cleared first, left open for the next ETF);
+    otherwise uses a figure of its own.
+    """
     
-    # Read range data
-    range_data = pd.read_excel(input_file, sheet_name=f'{etf}_Ranges')
-    range_data['Date'] = pd.to_datetime(range_data['Date'])
+    range_data = downsample(range_data)
     
     # Define colors (same as position distribution chart)
     colors = ['#e8f4fd', '#b3d9f2', '#5fa8d3', '#1e6ba8', '#05445e']
-    weight_columns = ['<1%', '1-2.5%', '2.5-5%', '5-7.5%', '>7.5%']
+    weight_columns = RANGE_LABELS
     
-    # Create figure
-    fig, ax = plt.subplots(figsize=(14, 8))
+    # Create figure, or clear the one passed in
+    own_fig = fig is None
+    if own_fig:
+        fig = plt.figure(figsize=(14, 8), layout='tight')
+    else:
+        fig.clf()
+    ax = fig.add_subplot(111)
     
     # Prepare data for stacking
     percentages = []
@@ -147,12 +184,11 @@ def create_stacked_mv_percentage_chart(etf, input_file):
     # Rotate x-axis labels
     plt.setp(ax.xaxis.get_majorticklabels(), rotation=45, ha='right')
     
-    plt.tight_layout()
-    
     # Save chart
     output_file = f"{OUTPUT_DIRS['market_value']}/{etf}_Market_Value_Stacked.png"
-    plt.savefig(output_file, dpi=300, bbox_inches='tight')
-    plt.close()
+    fig.savefig(output_file, dpi=150)
+    if own_fig:
+        plt.close(fig)
 
 def run():
     """Main function to create market value charts"""
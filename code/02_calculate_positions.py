@@ -7,61 +7,44 @@ import numpy as np
 import os
 import warnings
 warnings.filterwarnings('ignore')
-from config import OUTPUT_DIRS, CURRENT_RANGE
-from data_config import get_data_path
+from config import OUTPUT_DIRS, CURRENT_RANGE, RANGE_LABELS, RANGE_EDGES
+from data_config import load_etf
 
 def process_etf_data(fund_name):
     """Process a single ETF's data to get daily position counts by weight ranges"""
     
     
     # Read the data using centralized path
-    df = pd.read_excel(get_data_path(fund_name), sheet_name='Sheet1')
-    df['Date'] = pd.to_datetime(df['Date'])
+    df = load_etf(fund_name, columns=['Date', 'Weight'])
     
-    # Convert Weight from decimal to percentage (0.04 -> 4.0)
-    df['Weight'] = df['Weight'] * 100
+    weights = df['Weight'].to_numpy()
     
-    # Group by Date to get daily counts for ALL weight ranges
-    daily_data = []
+    # Integer date codes (load_etf returns rows in date order, so codes follow dates)
+    date_codes, dates = pd.factorize(df['Date'], sort=False)
+    n_dates = len(dates)
     
-    for date in df['Date'].unique():
-        date_df = df[df['Date'] == date]
-        
-        # Total positions for this date
-        total_positions = len(date_df)
-        
-        # Count positions in each weight range
-        count_under_1 = len(date_df[date_df['Weight'] < 1])
-        count_1_to_2_5 = len(date_df[(date_df['Weight'] >= 1) & (date_df['Weight'] < 2.5)])
-        count_2_5_to_5 = len(date_df[(date_df['Weight'] >= 2.5) & (date_df['Weight'] < 5)])
-        count_5_to_7_5 = len(date_df[(date_df['Weight'] >= 5) & (date_df['Weight'] < 7.5)])
-        count_over_7_5 = len(date_df[date_df['Weight'] >= 7.5])
-        
-        # Count positions in current selected weight range
-        if CURRENT_RANGE:
-            selected_positions = len(date_df[(date_df['Weight'] >= CURRENT_RANGE['min']) & 
-                                            (date_df['Weight'] < CURRENT_RANGE['max'])])
-        else:
-            selected_positions = count_under_1
-        
-        # Calculate percentage for selected range
-        selected_percentage = (selected_positions / total_positions * 100) if total_positions > 0 else 0
-        
-        daily_data.append({
-            'Date': date,
-            '<1%': count_under_1,
-            '1-2.5%': count_1_to_2_5,
-            '2.5-5%': count_2_5_to_5,
-            '5-7.5%': count_5_to_7_5,
-            '>7.5%': count_over_7_5,
-            'Total_Positions': total_positions,
-            'Selected_Positions': selected_positions,
-            'Selected_Percentage': selected_percentage
-        })
-    
-    # Convert to DataFrame
-    result = pd.DataFrame(daily_data)
-    result = result.sort_values('Date')
+    # Bucket every row into its weight range and count (date, bucket) pairs in one bincount
+    # (only the inner edges, so the first and last buckets are open-ended)
+    buckets = np.searchsorted(RANGE_EDGES[1:-1], weights, side='right')
+    has_weight = ~np.isnan(weights)
+    counts = np.bincount(date_codes[has_weight] * len(RANGE_LABELS) + buckets[has_weight],
+                         minlength=n_dates * len(RANGE_LABELS)).reshape(n_dates, len(RANGE_LABELS))
+    
+    result = pd.DataFrame(counts, columns=RANGE_LABELS)
+    result.insert(0, 'Date', dates)
+    
+    # Total positions for each date
+    result['Total_Positions'] = np.bincount(date_codes, minlength=n_dates)
+    
+    # Count positions in current selected weight range
+    if CURRENT_RANGE:
+        in_range = (weights >= CURRENT_RANGE['min']) & (weights < CURRENT_RANGE['max'])
+        result['Selected_Positions'] = np.bincount(date_codes[in_range], minlength=n_dates)
+    else:
+        result['Selected_Positions'] = result[RANGE_LABELS[0]]
+    
+    # Calculate percentage for selected range
+    result['Selected_Percentage'] = result['Selected_Positions'] / result['Total_Positions'] * 100
     
     return result
 
@@ -75,27 +58,28 @@ def save_positions_data_to_excel(all_data):
     output_filename = f"{folder_suffix}_Positions_Data.xlsx"
     output_path = f"{OUTPUT_DIRS['position']}/{output_filename}"
     
-    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+    with pd.ExcelWriter(output_path, engine='xlsxwriter') as writer:
         for etf, data in all_data.items():
             # Save raw daily data
             data.to_excel(writer, sheet_name=etf, index=False)
         
-        # Create summary sheet
-        summary_data = []
-        for etf, data in all_data.items():
-            summary_data.append({
-                'ETF': etf,
-                'Latest_Date': data['Date'].max(),
-                'Latest_Selected_Positions': data.iloc[-1]['Selected_Positions'],
-                'Latest_Total_Positions': data.iloc[-1]['Total_Positions'],
-                'Latest_Selected_Percentage': data.iloc[-1]['Selected_Percentage'],
-                'Avg_Selected_Positions': data['Selected_Positions'].mean(),
-                'Avg_Selected_Percentage': data['Selected_Percentage'].mean(),
-                'Max_Selected_Positions': data['Selected_Positions'].max(),
-                'Min_Selected_Positions': data['Selected_Positions'].min()
-            })
+        # Create summary sheet: one groupby-agg across all ETFs plus each ETF's latest row
+        summary_df = pd.DataFrame()
+        if all_data:
+            by_etf = pd.concat(all_data, names=['ETF']).reset_index(level=0).groupby('ETF', sort=False)
+            latest = by_etf.tail(1).set_index('ETF')
+            summary_df = by_etf.agg(
+                Latest_Date=('Date', 'max'),
+                Avg_Selected_Positions=('Selected_Positions', 'mean'),
+                Avg_Selected_Percentage=('Selected_Percentage', 'mean'),
+                Max_Selected_Positions=('Selected_Positions', 'max'),
+                Min_Selected_Positions=('Selected_Positions', 'min')
+            )
+            summary_df.insert(1, 'Latest_Selected_Positions', latest['Selected_Positions'])
+            summary_df.insert(2, 'Latest_Total_Positions', latest['Total_Positions'])
+            summary_df.insert(3, 'Latest_Selected_Percentage', latest['Selected_Percentage'])
+            summary_df = summary_df.reset_index()
         
-        summary_df = pd.DataFrame(summary_data)
         summary_df.to_excel(writer, sheet_name='Summary', index=False)
     
 
@@ -5,11 +5,13 @@ Reads data from Alternative_Returns_Data.xlsx and creates visualizations
 
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # Charts are only saved to disk, never shown
 import matplotlib.pyplot as plt
 import os
 import warnings
 warnings.filterwarnings('ignore')
-from config import OUTPUT_DIRS, CURRENT_RANGE
+from config import OUTPUT_DIRS, CURRENT_RANGE, downsample, ensure_datetime
 
 def plot_alternative_returns_charts():
     """Create alternative returns charts from saved Excel data"""
@@ -28,21 +30,28 @@ def plot_alternative_returns_charts():
     colors = {'ARKF': '#FF6B6B', 'ARKG': '#4ECDC4', 'ARKK': '#45B7D1', 
               'ARKQ': '#96CEB4', 'ARKW': '#FECA57'}
     
-    # Read summary data
-    summary_df = pd.read_excel(input_file, sheet_name='Summary')
+    # Parse the workbook once for the summary and every ETF's daily and weekly sheets
+    sheets = pd.read_excel(input_file, sheet_name=['Summary'] + [name for etf in etfs for name in (f'{etf}_Daily', f'{etf}_Weekly')])
+    summary_df = sheets['Summary']
     
-    # Create individual PNG for each ETF
+    # Create individual PNG for each ETF, drawing each one on the same figure
+    fig = plt.figure(figsize=(16, 6), layout='tight')
     for etf in etfs:
         
-        # Read ETF data
-        daily_data = pd.read_excel(input_file, sheet_name=f'{etf}_Daily')
-        weekly_data = pd.read_excel(input_file, sheet_name=f'{etf}_Weekly')
+        # ETF data
+        daily_data = sheets[f'{etf}_Daily']
+        weekly_data = sheets[f'{etf}_Weekly']
         
-        daily_data['Date'] = pd.to_datetime(daily_data['Date'])
-        weekly_data['Date'] = pd.to_datetime(weekly_data['Date'])
+        daily_data['Date'] = ensure_datetime(daily_data['Date'])
+        weekly_data['Date'] = ensure_datetime(weekly_data['Date'])
         
-        # Create figure with 2 subplots (weekly returns and cumulative returns)
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
+        # Thin long series before plotting
+        daily_data = downsample(daily_data)
+        weekly_data = downsample(weekly_data)
+        
+        # 2 subplots (weekly returns and cumulative returns)
+        fig.clf()
+        ax1, ax2 = fig.subplots(1, 2)
         
         # Weekly Returns subplot (left)
         ax1.plot(weekly_data['Date'], weekly_data['Weekly_Return_Total_%'], 
@@ -92,14 +101,12 @@ def plot_alternative_returns_charts():
         final_small = etf_summary['Final_Cumulative_Return_SmallOnly_%']
         difference = etf_summary['Small_vs_Total_Difference_%']
         
-        plt.suptitle(f'{etf} Alternative Returns Analysis', fontsize=16, fontweight='bold')
-        plt.tight_layout()
+        fig.suptitle(f'{etf} Alternative Returns Analysis', fontsize=16, fontweight='bold')
         
         # Save individual ETF chart
         output_file = f"{OUTPUT_DIRS['returns']}/{etf}_Alternative_Returns_Chart.png"
-        plt.savefig(output_file, dpi=300, bbox_inches='tight')
-        plt.close()
-        
+        fig.savefig(output_file, dpi=150)
+    plt.close(fig)
     
     print("✅ Alternative returns charts created")
 
@@ -8,7 +8,7 @@ import pandas as pd
 import numpy as np
 import os
 from config import OUTPUT_DIRS, CURRENT_RANGE
-from data_config import get_data_path
+from data_config import load_etf, daily_return
 
 def calculate_returns_comparison(etf_name):
     """
@@ -16,18 +16,14 @@ def calculate_returns_comparison(etf_name):
     Return = Sum(Yesterday_Position * Today_Price) / Sum(Yesterday_Position * Yesterday_Price)
     """
     
-    df = pd.read_excel(get_data_path(etf_name), sheet_name='Sheet1')
-    df['Date'] = pd.to_datetime(df['Date'])
-    
-    # Convert Weight from decimal to percentage (0.04 -> 4.0)
-    df['Weight'] = df['Weight'] * 100
+    df = load_etf(etf_name)
     
     # Sort by date and stock
     df = df.sort_values(['Bloomberg Name', 'Date'])
     
     # Calculate yesterday's position and price for each stock
-    df['Yesterday_Position'] = df.groupby('Bloomberg Name')['Position'].shift(1)
-    df['Yesterday_Price'] = df.groupby('Bloomberg Name')['Stock_Price'].shift(1)
+    df['Yesterday_Position'] = df.groupby('Bloomberg Name', observed=True)['Position'].shift(1)
+    df['Yesterday_Price'] = df.groupby('Bloomberg Name', observed=True)['Stock_Price'].shift(1)
     
     # Skip non-trading days (where price equals yesterday's price for ALL stocks)
     # This happens on holidays when data is repeated from previous day
@@ -37,78 +33,56 @@ def calculate_returns_comparison(etf_name):
     df['Yesterday_Value'] = df['Yesterday_Position'] * df['Yesterday_Price']
     df['Today_Value'] = df['Yesterday_Position'] * df['Stock_Price']
     
-    # Group by date to calculate daily returns
-    daily_results = []
-    
-    for date in df['Date'].unique():
-        date_df = df[df['Date'] == date].copy()
-        
-        # Remove rows without yesterday data (first day for each stock)
-        date_df = date_df.dropna(subset=['Yesterday_Value', 'Today_Value'])
-        
-        if len(date_df) == 0:
-            continue
-        
-        # Skip non-trading days (holidays) where no prices changed
-        # Check if ANY stock had a price change on this date
-        if not date_df['Price_Changed'].any():
-            continue  # Skip this date - it's a holiday with repeated data
-        
-        # Calculate return for all positions
-        total_yesterday_value = date_df['Yesterday_Value'].sum()
-        total_today_value = date_df['Today_Value'].sum()
-        
-        # Calculate return for positions excluding current weight range
-        # Use yesterday's weight to determine which positions to include
-        date_df['Yesterday_Weight'] = (date_df['Yesterday_Value'] / total_yesterday_value) * 100
-        
-        # Filter based on current weight range
-        if CURRENT_RANGE:
-            # Positions IN the current range (to be excluded from alternative return)
-            in_range = date_df[(date_df['Yesterday_Weight'] >= CURRENT_RANGE['min']) & 
-                              (date_df['Yesterday_Weight'] < CURRENT_RANGE['max'])]
-            # Positions OUTSIDE the current range (to be kept for alternative return)
-            out_of_range = date_df[(date_df['Yesterday_Weight'] < CURRENT_RANGE['min']) | 
-                                   (date_df['Yesterday_Weight'] >= CURRENT_RANGE['max'])]
-        else:
-            # Default fallback when no range specified
-            in_range = date_df[date_df['Yesterday_Weight'] < 1]
-            out_of_range = date_df[date_df['Yesterday_Weight'] >= 1]
-        
-        large_positions = out_of_range  # Positions to keep
-        small_positions = in_range      # Positions to exclude
-        
-        large_yesterday_value = large_positions['Yesterday_Value'].sum()
-        large_today_value = large_positions['Today_Value'].sum()
-        
-        small_yesterday_value = small_positions['Yesterday_Value'].sum()
-        small_today_value = small_positions['Today_Value'].sum()
-        
-        # Calculate returns
-        return_actual = (total_today_value / total_yesterday_value - 1) if total_yesterday_value > 0 else 0
-        return_exclude_small = (large_today_value / large_yesterday_value - 1) if large_yesterday_value > 0 else 0
-        return_small_only = (small_today_value / small_yesterday_value - 1) if small_yesterday_value > 0 else 0
-        
-        daily_results.append({
-            'Date': date,
-            'Return_Actual': return_actual,
-            'Return_ExcludeSmall': return_exclude_small,
-            'Return_SmallOnly': return_small_only,
-            'Total_Yesterday_Value': total_yesterday_value,
-            'Total_Today_Value': total_today_value,
-            'Large_Yesterday_Value': large_yesterday_value,
-            'Large_Today_Value': large_today_value,
-            'Small_Yesterday_Value': small_yesterday_value,
-            'Small_Today_Value': small_today_value
-        })
-    
-    comparison = pd.DataFrame(daily_results)
-    comparison = comparison.sort_values('Date').reset_index(drop=True)
+    # Remove rows without yesterday data (first day for each stock)
+    df = df.dropna(subset=['Yesterday_Value', 'Today_Value'])
+    
+    # Use yesterday's weight within each date's total to determine which positions to include
+    df['Yesterday_Weight'] = (df['Yesterday_Value'] / df.groupby('Date')['Yesterday_Value'].transform('sum')) * 100
+    
+    # Filter based on current weight range
+    if CURRENT_RANGE:
+        # Positions IN the current range (to be excluded from alternative return)
+        in_range = (df['Yesterday_Weight'] >= CURRENT_RANGE['min']) & (df['Yesterday_Weight'] < CURRENT_RANGE['max'])
+        # Positions OUTSIDE the current range (to be kept for alternative return)
+        out_of_range = (df['Yesterday_Weight'] < CURRENT_RANGE['min']) | (df['Yesterday_Weight'] >= CURRENT_RANGE['max'])
+    else:
+        # Default fallback when no range specified
+        in_range = df['Yesterday_Weight'] < 1
+        out_of_range = df['Yesterday_Weight'] >= 1
+    
+    df['Large_Yesterday_Value'] = df['Yesterday_Value'].where(out_of_range, 0.0)  # Positions to keep
+    df['Large_Today_Value'] = df['Today_Value'].where(out_of_range, 0.0)
+    df['Small_Yesterday_Value'] = df['Yesterday_Value'].where(in_range, 0.0)  # Positions to exclude
+    df['Small_Today_Value'] = df['Today_Value'].where(in_range, 0.0)
+    
+    # Daily totals for all, kept and excluded positions in one pass
+    daily_values = df.groupby('Date').agg(
+        Total_Yesterday_Value=('Yesterday_Value', 'sum'),
+        Total_Today_Value=('Today_Value', 'sum'),
+        Large_Yesterday_Value=('Large_Yesterday_Value', 'sum'),
+        Large_Today_Value=('Large_Today_Value', 'sum'),
+        Small_Yesterday_Value=('Small_Yesterday_Value', 'sum'),
+        Small_Today_Value=('Small_Today_Value', 'sum'),
+        Price_Changed=('Price_Changed', 'any')
+    )
+    
+    # Skip non-trading days (holidays) where no prices changed
+    daily_values = daily_values[daily_values['Price_Changed']].drop(columns='Price_Changed')
+    
+    # Calculate returns
+    daily_returns = pd.DataFrame({
+        'Return_Actual': daily_return(daily_values['Total_Today_Value'], daily_values['Total_Yesterday_Value']),
+        'Return_ExcludeSmall': daily_return(daily_values['Large_Today_Value'], daily_values['Large_Yesterday_Value']),
+        'Return_SmallOnly': daily_return(daily_values['Small_Today_Value'], daily_values['Small_Yesterday_Value'])
+    })
+    
+    # Already in date order: groupby sorts by Date
+    comparison = pd.concat([daily_returns, daily_values], axis=1).reset_index()
     
     # Calculate cumulative returns (starting from 1)
-    comparison['Cumulative_Actual'] = (1 + comparison['Return_Actual'].fillna(0)).cumprod()
-    comparison['Cumulative_ExcludeSmall'] = (1 + comparison['Return_ExcludeSmall'].fillna(0)).cumprod()
-    comparison['Cumulative_SmallOnly'] = (1 + comparison['Return_SmallOnly'].fillna(0)).cumprod()
+    # (one cumulative product down all three return columns)
+    returns = comparison[['Return_Actual', 'Return_ExcludeSmall', 'Return_SmallOnly']].fillna(0).to_numpy()
+    comparison[['Cumulative_Actual', 'Cumulative_ExcludeSmall', 'Cumulative_SmallOnly']] = np.cumprod(1 + returns, axis=0)
     
     return comparison
 
@@ -128,7 +102,7 @@ def save_alternative_returns_data():
         all_results[etf] = daily_data
         
         # Convert to weekly data
-        daily_data['Week'] = pd.to_datetime(daily_data['Date']).dt.to_period('W')
+        daily_data['Week'] = daily_data['Date'].dt.to_period('W')
         
         # Calculate weekly returns from daily cumulative returns
         weekly_data = daily_data.groupby('Week').agg({
@@ -138,16 +112,11 @@ def save_alternative_returns_data():
             'Cumulative_SmallOnly': 'last'
         }).reset_index()
         
-        # Calculate weekly returns
-        weekly_data['Weekly_Return_Actual'] = weekly_data['Cumulative_Actual'].pct_change()
-        weekly_data['Weekly_Return_ExcludeSmall'] = weekly_data['Cumulative_ExcludeSmall'].pct_change()
-        weekly_data['Weekly_Return_SmallOnly'] = weekly_data['Cumulative_SmallOnly'].pct_change()
-        
-        # For first week, use the cumulative return as the weekly return
-        if len(weekly_data) > 0:
-            weekly_data.loc[0, 'Weekly_Return_Actual'] = weekly_data.loc[0, 'Cumulative_Actual'] - 1
-            weekly_data.loc[0, 'Weekly_Return_ExcludeSmall'] = weekly_data.loc[0, 'Cumulative_ExcludeSmall'] - 1
-            weekly_data.loc[0, 'Weekly_Return_SmallOnly'] = weekly_data.loc[0, 'Cumulative_SmallOnly'] - 1
+        # Calculate weekly returns; the first week is measured from the starting value of 1,
+        # so its weekly return is its cumulative return
+        for name in ('Actual', 'ExcludeSmall', 'SmallOnly'):
+            cumulative = weekly_data[f'Cumulative_{name}']
+            weekly_data[f'Weekly_Return_{name}'] = cumulative / cumulative.shift(fill_value=1.0) - 1
         
         all_weekly_results[etf] = weekly_data
     
@@ -156,7 +125,7 @@ def save_alternative_returns_data():
     output_filename = f"{folder_suffix}_Returns_Data.xlsx"
     output_path = f"{OUTPUT_DIRS['returns']}/{output_filename}"
     
-    with pd.ExcelWriter(output_path) as writer:
+    with pd.ExcelWriter(output_path, engine='xlsxwriter') as writer:
         # Save daily data for each ETF
         for etf in etfs:
             daily_data = all_results[etf]
@@ -164,19 +133,16 @@ def save_alternative_returns_data():
         
         # Save weekly data for each ETF
         for etf in etfs:
-            weekly_data = all_weekly_results[etf].copy()
+            weekly_data = all_weekly_results[etf]
             
-            # Select and rename columns for output
-            output_data = pd.DataFrame({
-                'Week': weekly_data['Week'].astype(str),
-                'Date': weekly_data['Date'],
-                'Weekly_Return_Total_%': weekly_data['Weekly_Return_Actual'] * 100,
-                'Weekly_Return_SmallOnly_%': weekly_data['Weekly_Return_SmallOnly'] * 100,
-                'Weekly_Return_ExcludeSmall_%': weekly_data['Weekly_Return_ExcludeSmall'] * 100,
-                'Cumulative_Return_Total_%': (weekly_data['Cumulative_Actual'] - 1) * 100,
-                'Cumulative_Return_SmallOnly_%': (weekly_data['Cumulative_SmallOnly'] - 1) * 100,
-                'Cumulative_Return_ExcludeSmall_%': (weekly_data['Cumulative_ExcludeSmall'] - 1) * 100
-            })
+            # Select and rename columns for output, scaling each group of columns in one block
+            output_data = weekly_data[['Week', 'Date']].assign(Week=weekly_data['Week'].astype(str))
+            output_data[['Weekly_Return_Total_%', 'Weekly_Return_SmallOnly_%', 'Weekly_Return_ExcludeSmall_%']] = (
+                weekly_data[['Weekly_Return_Actual', 'Weekly_Return_SmallOnly', 'Weekly_Return_ExcludeSmall']].to_numpy() * 100
+            )
+            output_data[['Cumulative_Return_Total_%', 'Cumulative_Return_SmallOnly_%', 'Cumulative_Return_ExcludeSmall_%']] = (
+                (weekly_data[['Cumulative_Actual', 'Cumulative_SmallOnly', 'Cumulative_ExcludeSmall']].to_numpy() - 1) * 100
+            )
             
             output_data.to_excel(writer, sheet_name=f'{etf}_Weekly', index=False)
         
@@ -5,12 +5,14 @@ Reads data from Graduation_Returns_Data.xlsx and creates visualizations
 
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # Charts are only saved to disk, never shown
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 import os
 import warnings
 warnings.filterwarnings('ignore')
-from config import OUTPUT_DIRS, CURRENT_RANGE
+from config import OUTPUT_DIRS, CURRENT_RANGE, ensure_datetime
 
 def plot_graduation_charts():
     """Create graduation analysis charts from saved Excel data"""
@@ -28,18 +30,21 @@ def plot_graduation_charts():
     colors = {'ARKF': '#FF6B6B', 'ARKG': '#4ECDC4', 'ARKK': '#45B7D1', 
               'ARKQ': '#96CEB4', 'ARKW': '#FECA57'}
     
-    # Read summary data
-    summary_df = pd.read_excel(input_file, sheet_name='Summary')
+    # Parse the workbook once for the summary and every ETF's weekly sheet
+    sheets = pd.read_excel(input_file, sheet_name=['Summary'] + etfs)
+    summary_df = sheets['Summary']
     
-    # Create individual charts for each ETF
+    # Create individual charts for each ETF, drawing each one on the same figure
+    fig = plt.figure(figsize=(16, 6), layout='tight')
     for etf in etfs:
         
-        # Read ETF weekly data
-        weekly_data = pd.read_excel(input_file, sheet_name=etf)
-        weekly_data['Date'] = pd.to_datetime(weekly_data['Date'])
+        # ETF weekly data
+        weekly_data = sheets[etf]
+        weekly_data['Date'] = ensure_datetime(weekly_data['Date'])
         
-        # Create figure with 2 subplots
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
+        # 2 subplots (weekly returns and cumulative returns)
+        fig.clf()
+        ax1, ax2 = fig.subplots(1, 2)
         
         # Weekly returns comparison (left)
         ax1.plot(weekly_data['Date'], weekly_data['Weekly_Return_Small_%'], 
@@ -89,14 +94,12 @@ def plot_graduation_charts():
                 bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5),
                 verticalalignment='top', fontsize=9)
         
-        plt.suptitle(f'{etf} - Graduated Positions Analysis', fontsize=16, fontweight='bold')
-        plt.tight_layout()
+        fig.suptitle(f'{etf} - Graduated Positions Analysis', fontsize=16, fontweight='bold')
         
         # Save individual chart
         output_file = f"{OUTPUT_DIRS['graduation']}/{etf}_Graduated_Analysis_Chart.png"
-        plt.savefig(output_file, dpi=300, bbox_inches='tight')
-        plt.close()
-        
+        fig.savefig(output_file, dpi=150)
+    plt.close(fig)
     
     print("✅ Graduation charts created")
 
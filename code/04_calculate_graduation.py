@@ -11,7 +11,7 @@ import numpy as np
 import warnings
 warnings.filterwarnings('ignore')
 from config import OUTPUT_DIRS, CURRENT_RANGE
-from data_config import get_data_path
+from data_config import load_etf, daily_return
 import os
 
 def calculate_graduated_returns(etf_name):
@@ -24,105 +24,83 @@ def calculate_graduated_returns(etf_name):
     """
     
     # Read data
-    df = pd.read_excel(get_data_path(etf_name), sheet_name='Sheet1')
-    df['Date'] = pd.to_datetime(df['Date'])
-    
-    # Convert Weight from decimal to percentage (0.04 -> 4.0)
-    df['Weight'] = df['Weight'] * 100
+    df = load_etf(etf_name)
     df['Weight_Pct'] = df['Weight']  # For compatibility
     
     # Sort by stock and date
     df = df.sort_values(['Bloomberg Name', 'Date'])
     
-    # Identify graduated positions
-    graduated_tickers = set()
-    for ticker, group in df.groupby('Bloomberg Name'):
-        group = group.sort_values('Date')
-        # Check if this ticker ever graduated from weight range to higher
-        was_small = False
-        weight_threshold = CURRENT_RANGE['max'] if CURRENT_RANGE else 1.0
-        for idx in range(len(group)):
-            weight = group.iloc[idx]['Weight_Pct']
-            if weight < weight_threshold:
-                was_small = True
-            elif was_small and weight >= weight_threshold:
-                # This ticker graduated
-                graduated_tickers.add(ticker)
-                break
+    # One per-ticker grouping for the graduation scan and yesterday's values
+    weight_threshold = CURRENT_RANGE['max'] if CURRENT_RANGE else 1.0
+    df['Below_Threshold'] = df['Weight_Pct'] < weight_threshold
+    by_ticker = df.groupby('Bloomberg Name', observed=True)
     
+    # Identify graduated positions: a ticker graduated if it was ever in weight range
+    # and later at or above the range's upper bound (rows are in date order per ticker)
+    graduated = by_ticker['Below_Threshold'].cummax() & (df['Weight_Pct'] >= weight_threshold)
+    graduated_tickers = set(df.loc[graduated, 'Bloomberg Name'])
+    df['Graduated_Ticker'] = graduated.groupby(df['Bloomberg Name'], observed=True).transform('any')
     
     # Calculate yesterday's position and price for each stock
-    df['Yesterday_Position'] = df.groupby('Bloomberg Name')['Position'].shift(1)
-    df['Yesterday_Price'] = df.groupby('Bloomberg Name')['Stock_Price'].shift(1)
-    
+    yesterday = by_ticker[['Position', 'Stock_Price']].shift(1)
+    df['Yesterday_Position'] = yesterday['Position']
+    df['Yesterday_Price'] = yesterday['Stock_Price']
     
     # Calculate position value for return calculation
     df['Yesterday_Value'] = df['Yesterday_Position'] * df['Yesterday_Price']
     df['Today_Value'] = df['Yesterday_Position'] * df['Stock_Price']
     
-    # Group by date to calculate daily returns
-    daily_results = []
-    
-    for date in df['Date'].unique():
-        date_df = df[df['Date'] == date].copy()
-        
-        # Remove rows without yesterday data
-        date_df = date_df.dropna(subset=['Yesterday_Value', 'Today_Value'])
-        
-        if len(date_df) == 0:
-            continue
-        
-        # Calculate return for ALL positions in weight range
-        # Use yesterday's weight to determine which positions to include
-        total_yesterday_value_all = date_df['Yesterday_Value'].sum()
-        date_df['Yesterday_Weight'] = (date_df['Yesterday_Value'] / total_yesterday_value_all) * 100
-        
-        # Small positions are those in weight range yesterday
-        # Filter based on current weight range
-        if CURRENT_RANGE:
-            small_positions = date_df[(date_df['Yesterday_Weight'] >= CURRENT_RANGE['min']) & 
-                                     (date_df['Yesterday_Weight'] < CURRENT_RANGE['max'])]
-        else:
-            small_positions = date_df[date_df['Yesterday_Weight'] < 1]
-        
-        small_yesterday_value = small_positions['Yesterday_Value'].sum()
-        small_today_value = small_positions['Today_Value'].sum()
-        
-        # Calculate return for GRADUATED positions that are NOW above range
-        # These are graduated tickers that are currently in large position state (above range)
-        # Positions above the weight range
-        if CURRENT_RANGE:
-            large_positions = date_df[date_df['Yesterday_Weight'] >= CURRENT_RANGE['max']]
-        else:
-            large_positions = date_df[date_df['Yesterday_Weight'] >= 1]
-        graduated_large = large_positions[large_positions['Bloomberg Name'].isin(graduated_tickers)]
-        
-        grad_yesterday_value = graduated_large['Yesterday_Value'].sum()
-        grad_today_value = graduated_large['Today_Value'].sum()
-        
-        # Calculate returns
-        return_small = (small_today_value / small_yesterday_value - 1) if small_yesterday_value > 0 else 0
-        return_graduated = (grad_today_value / grad_yesterday_value - 1) if grad_yesterday_value > 0 else 0
-        
-        
-        daily_results.append({
-            'Date': date,
-            'Return_SmallPositions': return_small,
-            'Return_Graduated': return_graduated,
-            'Small_Yesterday_Value': small_yesterday_value,
-            'Small_Today_Value': small_today_value,
-            'Graduated_Yesterday_Value': grad_yesterday_value,
-            'Graduated_Today_Value': grad_today_value,
-            'Num_Small_Positions': len(small_positions),
-            'Num_Graduated_Large': len(graduated_large)
-        })
-    
-    comparison = pd.DataFrame(daily_results)
-    comparison = comparison.sort_values('Date').reset_index(drop=True)
+    # Remove rows without yesterday data
+    df = df.dropna(subset=['Yesterday_Value', 'Today_Value'])
+    
+    # Use yesterday's weight within each date's total to determine which positions to include
+    df['Yesterday_Weight'] = (df['Yesterday_Value'] / df.groupby('Date')['Yesterday_Value'].transform('sum')) * 100
+    
+    # Small positions are those in weight range yesterday
+    # Filter based on current weight range
+    if CURRENT_RANGE:
+        small = (df['Yesterday_Weight'] >= CURRENT_RANGE['min']) & (df['Yesterday_Weight'] < CURRENT_RANGE['max'])
+    else:
+        small = df['Yesterday_Weight'] < 1
+    
+    # GRADUATED positions that are NOW above range
+    # These are graduated tickers that are currently in large position state (above range)
+    if CURRENT_RANGE:
+        large = df['Yesterday_Weight'] >= CURRENT_RANGE['max']
+    else:
+        large = df['Yesterday_Weight'] >= 1
+    graduated_large = large & df['Graduated_Ticker']
+    
+    df['Small_Yesterday_Value'] = df['Yesterday_Value'].where(small, 0.0)
+    df['Small_Today_Value'] = df['Today_Value'].where(small, 0.0)
+    df['Graduated_Yesterday_Value'] = df['Yesterday_Value'].where(graduated_large, 0.0)
+    df['Graduated_Today_Value'] = df['Today_Value'].where(graduated_large, 0.0)
+    df['Is_Small'] = small
+    df['Is_Graduated_Large'] = graduated_large
+    
+    # Daily totals and counts for small and graduated positions in one pass
+    daily_values = df.groupby('Date').agg(
+        Small_Yesterday_Value=('Small_Yesterday_Value', 'sum'),
+        Small_Today_Value=('Small_Today_Value', 'sum'),
+        Graduated_Yesterday_Value=('Graduated_Yesterday_Value', 'sum'),
+        Graduated_Today_Value=('Graduated_Today_Value', 'sum'),
+        Num_Small_Positions=('Is_Small', 'sum'),
+        Num_Graduated_Large=('Is_Graduated_Large', 'sum')
+    )
+    
+    # Calculate returns
+    daily_returns = pd.DataFrame({
+        'Return_SmallPositions': daily_return(daily_values['Small_Today_Value'], daily_values['Small_Yesterday_Value']),
+        'Return_Graduated': daily_return(daily_values['Graduated_Today_Value'], daily_values['Graduated_Yesterday_Value'])
+    })
+    
+    # Already in date order: groupby sorts by Date
+    comparison = pd.concat([daily_returns, daily_values], axis=1).reset_index()
     
     # Calculate cumulative returns (starting from 1)
-    comparison['Cumulative_SmallPositions'] = (1 + comparison['Return_SmallPositions'].fillna(0)).cumprod()
-    comparison['Cumulative_Graduated'] = (1 + comparison['Return_Graduated'].fillna(0)).cumprod()
+    # (one cumulative product down both return columns)
+    returns = comparison[['Return_SmallPositions', 'Return_Graduated']].fillna(0).to_numpy()
+    comparison[['Cumulative_SmallPositions', 'Cumulative_Graduated']] = np.cumprod(1 + returns, axis=0)
     
     return comparison, graduated_tickers
 
@@ -151,7 +129,7 @@ def save_graduation_data(all_results, all_graduated_tickers):
     
     output_file = f"{output_dir}/Graduation_Returns_Data.xlsx"
     
-    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+    with pd.ExcelWriter(output_file, engine='xlsxwriter') as writer:
         # Summary sheet
         summary_data = []
         for etf in all_results.keys():
@@ -176,11 +154,10 @@ def save_graduation_data(all_results, all_graduated_tickers):
         
         # Weekly data for each ETF
         for etf in all_results.keys():
-            data = all_results[etf].copy()
+            data = all_results[etf]
             
-            # Convert to weekly
-            data['Week'] = pd.to_datetime(data['Date']).dt.to_period('W')
-            weekly = data.groupby('Week').agg({
+            # Convert to weekly, grouping on the week key without adding it to the daily frame
+            weekly = data.groupby(data['Date'].dt.to_period('W').rename('Week')).agg({
                 'Date': 'last',
                 'Cumulative_SmallPositions': 'last',
                 'Cumulative_Graduated': 'last',
@@ -198,8 +175,8 @@ def save_graduation_data(all_results, all_graduated_tickers):
             output_data = weekly[['Week', 'Date', 
                                  'Weekly_Return_Small_%', 'Weekly_Return_Graduated_%',
                                  'Cumulative_Return_Small_%', 'Cumulative_Return_Graduated_%',
-                                 'Num_Small_Positions', 'Num_Graduated_Large']].copy()
-            output_data['Week'] = output_data['Week'].astype(str)
+                                 'Num_Small_Positions', 'Num_Graduated_Large']]
+            output_data = output_data.assign(Week=output_data['Week'].astype(str))
             
             output_data.to_excel(writer, sheet_name=etf, index=False)
         
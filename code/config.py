@@ -12,6 +12,11 @@ WEIGHT_RANGES = [
     {'min': 7.5, 'max': 100, 'label': '>7.5%', 'folder': 'over_7.5pct'}
 ]
 
+# Weight-range buckets shared by the by-range reports:
+# RANGE_EDGES[i] <= weight < RANGE_EDGES[i + 1] is bucket RANGE_LABELS[i]
+RANGE_LABELS = [r['label'] for r in WEIGHT_RANGES]
+RANGE_EDGES = [WEIGHT_RANGES[0]['min']] + [r['max'] for r in WEIGHT_RANGES]
+
 # Current weight range (will be set dynamically)
 CURRENT_RANGE = None
 
@@ -91,4 +96,26 @@ def format_value(x, pos=None):
     else:
         return f'${x/1e3:.0f}K'
 
+def ensure_datetime(values):
+    """Dates read back from an output workbook: already datetime64, otherwise parse them as ISO strings"""
+    # Imported here so importing config (e.g. from main.py's menu) does not load pandas
+    import pandas as pd
+    
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    return pd.to_datetime(values, format='ISO8601')
+
+# Longest series drawn as-is; longer ones are thinned before plotting
+MAX_PLOT_POINTS = 1500
+
+def downsample(data, max_points=MAX_PLOT_POINTS):
+    """Keep every k-th row of a chart's data (plus the last row) so at most about max_points are drawn"""
+    if len(data) <= max_points:
+        return data
+    step = -(-len(data) // max_points)
+    rows = list(range(0, len(data), step))
+    if rows[-1] != len(data) - 1:
+        rows.append(len(data) - 1)
+    return data.iloc[rows]
+
 # ETF list comes from data_config
\ No newline at end of file
@@ -5,7 +5,9 @@ All data files will be read from 'Sheet1' in the Excel files
 """
 
 from pathlib import Path
-import glob
+import functools
+import importlib.util
+import os
 
 # Get the absolute path to the project root (1 percent v3 directory)
 CODE_DIR = Path(__file__).parent.absolute()
@@ -15,41 +17,70 @@ PROJECT_ROOT = CODE_DIR.parent.absolute()
 INPUT_DIR = PROJECT_ROOT / 'input'
 OUTPUT_DIR = PROJECT_ROOT / 'output'
 
+# Parsed copies of the input workbooks, so later runs skip the Excel parse
+CACHE_DIR = PROJECT_ROOT / 'cache'
+
+# Version of the frame _read_etf_data produces; bump it whenever the
+# loader's transforms change so caches built by older code are re-parsed
+_CACHE_VERSION = 2
+
 # Default sheet name for all Excel files
 SHEET_NAME = 'Sheet1'
 
+# Read workbooks with the Rust-based calamine parser when it is installed;
+# otherwise fall back to openpyxl (which pandas already opens read-only)
+EXCEL_ENGINE = 'calamine' if importlib.util.find_spec('python_calamine') else 'openpyxl'
+
+# ETFs the analysis knows about, each read from FUND_Transformed_Data.xlsx in INPUT_DIR
+ETF_FUNDS = ('ARKF', 'ARKG', 'ARKK', 'ARKQ', 'ARKW', 'ARKX')
+
 # Store the selected data files
 DATA_FILES = {}
 AVAILABLE_ETF_FILES = {}  # Store the latest file for each ETF
 SELECTED_ETF = None  # Currently selected ETF for analysis
 
+# Names of the files in INPUT_DIR, keyed on the directory's mtime so it is
+# only rescanned after files have been added, removed or renamed
+_DIR_LISTING_CACHE = {}
+
+def _list_input_dir():
+    """Names of the files in INPUT_DIR (empty if the folder does not exist)"""
+    try:
+        key = (INPUT_DIR, INPUT_DIR.stat().st_mtime_ns)
+    except FileNotFoundError:
+        return frozenset()
+    
+    if key not in _DIR_LISTING_CACHE:
+        _DIR_LISTING_CACHE.clear()
+        with os.scandir(INPUT_DIR) as entries:
+            _DIR_LISTING_CACHE[key] = frozenset(entry.name for entry in entries if entry.is_file())
+    return _DIR_LISTING_CACHE[key]
+
+# Listing that AVAILABLE_ETF_FILES was last built from
+_INDEXED_LISTING = None
+
+def clear_cache():
+    """Forget the cached listing of INPUT_DIR"""
+    _DIR_LISTING_CACHE.clear()
+
 def find_latest_etf_files():
     """Find data files for each ETF in the input folder"""
-    global AVAILABLE_ETF_FILES
+    global AVAILABLE_ETF_FILES, _INDEXED_LISTING
     AVAILABLE_ETF_FILES = {}
 
-    # Search in input folder
-    search_path = INPUT_DIR
-
-    if search_path.exists():
-        # Find all files for each ETF
-        for fund in ['ARKF', 'ARKG', 'ARKK', 'ARKQ', 'ARKW', 'ARKX']:
-            # Look for files with pattern FUND_Transformed_Data.xlsx
-            pattern = str(search_path / f"{fund}_Transformed_Data.xlsx")
-            files = glob.glob(pattern)
-
-            for file in files:
-                # Skip temporary Excel files
-                if '~$' in file:
-                    continue
-
-                file_path = Path(file)
-                if file_path.exists():
-                    AVAILABLE_ETF_FILES[fund] = {
-                        'path': file_path,
-                        'date': 'latest',
-                        'exists': True
-                    }
+    # Search in input folder (one directory scan for all funds)
+    file_names = _list_input_dir()
+    _INDEXED_LISTING = file_names
+
+    for fund in ETF_FUNDS:
+        # Look for files named FUND_Transformed_Data.xlsx
+        file_name = f"{fund}_Transformed_Data.xlsx"
+        if file_name in file_names:
+            AVAILABLE_ETF_FILES[fund] = {
+                'path': INPUT_DIR / file_name,
+                'date': 'latest',
+                'exists': True
+            }
 
 def set_selected_etf(etf_name):
     """Set single ETF to use for analysis"""
@@ -57,39 +88,34 @@ def set_selected_etf(etf_name):
     SELECTED_ETF = etf_name
     DATA_FILES = {}
 
+    _ensure_loaded()
     if etf_name in AVAILABLE_ETF_FILES:
         DATA_FILES[etf_name] = AVAILABLE_ETF_FILES[etf_name]['path']
 
     return len(DATA_FILES) > 0
 
+def _ensure_loaded():
+    """
+    Scan the input folder on first use rather than at import, and again
+    whenever its contents have changed since the last scan (one stat otherwise)
+    """
+    if not AVAILABLE_ETF_FILES or _list_input_dir() != _INDEXED_LISTING:
+        find_latest_etf_files()
+
 def get_available_etf_files():
     """Get all available ETF files (latest version for each)"""
-    if not AVAILABLE_ETF_FILES:
-        find_latest_etf_files()
+    _ensure_loaded()
     return AVAILABLE_ETF_FILES
 
 # Try to find data files with pattern matching
 def find_data_file(fund_name):
     """Find the most recent data file for a fund"""
-    pattern = str(PROJECT_ROOT / f"{fund_name}_historical data_*.xlsx")
-    files = glob.glob(pattern)
-    if files:
-        # Return the most recent file (sorted by filename, assuming date format YYYYMMDD)
-        return Path(sorted(files)[-1])
-    return None
-
-# Build DATA_FILES dynamically with default selection
-def initialize_default_data_files():
-    """Initialize with all available ETF files"""
-    global DATA_FILES, SELECTED_ETF
-    find_latest_etf_files()
-
-    # Don't select any ETF by default - user will select in main menu
-    # Just populate the available files
-    pass
+    # The most recent file is the greatest filename (assuming date format YYYYMMDD)
+    return max(PROJECT_ROOT.glob(f"{fund_name}_historical data_*.xlsx"), default=None)
 
-# Initialize on import
-initialize_default_data_files()
+# The input folder is scanned lazily, on the first get_available_etf_files(),
+# set_selected_etf() or get_data_path() call, so importing this module does
+# no filesystem work
 
 def get_data_path(fund_name):
     """
@@ -101,6 +127,7 @@ def get_data_path(fund_name):
     Returns:
         Path object to the data file
     """
+    _ensure_loaded()
     if fund_name not in DATA_FILES:
         raise ValueError(f"Unknown fund: {fund_name}. Must be one of {list(DATA_FILES.keys())}")
     
@@ -110,6 +137,101 @@ def get_data_path(fund_name):
     
     return path
 
+@functools.lru_cache(maxsize=None)
+def _read_etf_data(path, size, mtime_ns):
+    """
+    Parse a fund's Excel file once per process for each (size, mtime) it has,
+    so a rewritten workbook is picked up without restarting. The parsed frame
+    is also pickled to CACHE_DIR and reused while the loader version and the
+    workbook's size and mtime all match the ones it was built from.
+    """
+    # pandas is imported here, not at module level, so the menu's imports
+    # of this module stay cheap
+    import pandas as pd
+    
+    path = Path(path)
+    cache_path = CACHE_DIR / f"{path.stem}.pkl"
+    cache_key = {'version': _CACHE_VERSION, 'size': size, 'mtime_ns': mtime_ns}
+    
+    if cache_path.exists():
+        try:
+            cached = pd.read_pickle(cache_path)
+            if isinstance(cached, dict) and cached.get('key') == cache_key:
+                return cached['data']
+        except Exception:
+            pass  # Unreadable cache (e.g. written by another pandas version), re-parse
+    
+    df = pd.read_excel(path, sheet_name=SHEET_NAME, engine=EXCEL_ENGINE)
+    
+    # Dates are stored as MM/DD/YYYY strings; an explicit format skips inference
+    # and the cache parses each distinct date only once
+    df['Date'] = pd.to_datetime(df['Date'], format='%m/%d/%Y', cache=True)
+    
+    # Keep rows in date order so groupbys on dates can skip sorting (sort=False)
+    df = df.sort_values('Date', kind='stable')
+    
+    # Convert Weight from decimal to percentage (0.04 -> 4.0)
+    df['Weight'] = df['Weight'].to_numpy() * 100.0
+    
+    # Group on integer codes instead of hashing ticker strings
+    df['Bloomberg Name'] = df['Bloomberg Name'].astype('category')
+    
+    # Write via a temp file so parallel runs never read a half-written cache
+    CACHE_DIR.mkdir(exist_ok=True)
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    pd.to_pickle({'key': cache_key, 'data': df}, tmp_path)
+    os.replace(tmp_path, cache_path)
+    
+    return df
+
+def get_cache_path(file_name):
+    """Path in CACHE_DIR for an intermediate result handed from one step to the next"""
+    CACHE_DIR.mkdir(exist_ok=True)
+    return CACHE_DIR / file_name
+
+def load_etf(fund_name, columns=None):
+    """
+    Load a fund's historical data sorted by Date, with Date parsed, Weight in
+    percent and Bloomberg Name as a categorical (group on it with observed=True)
+    
+    The Excel file is only parsed when it has changed since the last run;
+    calls return a copy of the cached frame so callers are free to modify it.
+    
+    Args:
+        fund_name: ETF name (ARKF, ARKG, ARKK, ARKQ, ARKW)
+        columns: Optional list of columns to return; only these are copied
+    
+    Returns:
+        DataFrame with the fund's Sheet1 data
+    """
+    path = get_data_path(fund_name)
+    stat = path.stat()
+    df = _read_etf_data(path, stat.st_size, stat.st_mtime_ns)
+    if columns is not None:
+        df = df[columns]
+    return df.copy()
+
+def shift_within_ticker(df, column):
+    """
+    Previous row's value for the same ticker (NaN on each ticker's first row).
+    Rows must already be sorted by Bloomberg Name, which must be the
+    categorical column load_etf returns.
+    """
+    import numpy as np
+    
+    codes = df['Bloomberg Name'].cat.codes.to_numpy()
+    values = df[column].to_numpy(dtype=float)
+    
+    prev = np.full(len(values), np.nan)
+    prev[1:] = values[:-1]
+    prev[1:][codes[1:] != codes[:-1]] = np.nan
+    
+    return prev
+
+def daily_return(today_value, yesterday_value):
+    """Today's value over yesterday's, minus 1; 0 where yesterday's value is not positive"""
+    return (today_value / yesterday_value - 1).where(yesterday_value > 0, 0.0)
+
 def verify_all_data_files():
     """Verify all data files exist"""
     missing = []
@@ -5,13 +5,17 @@ You can run for a single weight range or batch process all ranges
 
 import sys
 import os
+import io
 import importlib
+import contextlib
+import multiprocessing as mp
 
 # Set the working directory to code folder
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
 # Import configuration
 from config import create_directories, WEIGHT_RANGES, set_current_range, CURRENT_RANGE
+import data_config
 
 # Global flag for all ranges mode
 ALL_RANGES_MODE = False
@@ -31,10 +35,44 @@ modules = {
     '4.1': ('04_1_plot_graduation', 'Plot graduation analysis charts')
 }
 
+# Step keys in run/menu order; the steps never change, so sort them once
+_SORTED_MODULE_KEYS = sorted(modules)
+
+def _format_menu_steps():
+    """Step lines of the menu, with a blank line before each major group after the first"""
+    lines = []
+    last_major = None
+    for key in _SORTED_MODULE_KEYS:
+        _, desc = modules[key]  # Using _ to indicate module name not used here
+        major = key.split('.')[0]
+        if major != last_major and '.' not in key:
+            if last_major is not None:
+                lines.append('')  # Add spacing between groups
+            last_major = major
+        indent = "    " if '.' in key else "  "
+        lines.append(f"{indent}{key}. {desc}")
+    return "\n".join(lines)
+
+# The step list and options never change, so lay them out once
+_MENU_STEPS = _format_menu_steps()
+_MENU_BODY = "\n".join([
+    "\nAvailable steps:",
+    _MENU_STEPS,
+    "  A. Run all steps for current range",
+    "  B. Batch run all steps for ALL weight ranges",
+    "  R. Select weight range",
+    "  E. Select ETF for analysis",
+    "  Q. Quit",
+    "-"*60,
+]) + "\n"
+
+# Menu number for each ETF in the selection list
+_ETF_CHOICE_MAP = {str(i): etf for i, etf in enumerate(data_config.ETF_FUNDS, 1)}
+
 def print_menu():
     """Print menu options"""
     # Check if we're in all ranges mode
-    if globals().get('ALL_RANGES_MODE', False):
+    if ALL_RANGES_MODE:
         current_label = 'ALL RANGES MODE'
     elif CURRENT_RANGE:
         current_label = CURRENT_RANGE['label']
@@ -42,36 +80,15 @@ def print_menu():
         current_label = '<1%'
 
     # Show current selected ETF
-    from data_config import DATA_FILES, SELECTED_ETF
-
-    if SELECTED_ETF and DATA_FILES:
-        data_info = f"Selected ETF: {SELECTED_ETF}"
+    if data_config.SELECTED_ETF and data_config.DATA_FILES:
+        data_info = f"Selected ETF: {data_config.SELECTED_ETF}"
     else:
         data_info = "No ETF selected - Please select an ETF first (option E)"
 
-    print("\n" + "="*60)
-    print(f"ARK ETF Position Analysis - {current_label}")
-    print(f"{data_info}")
-    print("="*60)
-    print("\nAvailable steps:")
-    
-    # Group modules by major number
-    last_major = None
-    for key in sorted(modules.keys()):
-        _, desc = modules[key]  # Using _ to indicate module name not used here
-        major = key.split('.')[0]
-        if major != last_major and '.' not in key:
-            if last_major is not None:
-                print()  # Add spacing between groups
-            last_major = major
-        indent = "    " if '.' in key else "  "
-        print(f"{indent}{key}. {desc}")
-    print("  A. Run all steps for current range")
-    print("  B. Batch run all steps for ALL weight ranges")
-    print("  R. Select weight range")
-    print("  E. Select ETF for analysis")
-    print("  Q. Quit")
-    print("-"*60)
+    # Only the two header lines change between prints, so write the menu in one call
+    header = f"\n{'='*60}\nARK ETF Position Analysis - {current_label}\n{data_info}\n{'='*60}\n"
+    sys.stdout.write(header + _MENU_BODY)
+    sys.stdout.flush()
 
 def select_weight_range():
     """Let user select a weight range"""
@@ -98,7 +115,7 @@ def select_weight_range():
 
 def select_etf():
     """Let user select which ETF to analyze"""
-    from data_config import get_available_etf_files, set_selected_etf, SELECTED_ETF
+    from data_config import get_available_etf_files, set_selected_etf
 
     print("\n" + "="*60)
     print("Select ETF for Analysis")
@@ -116,9 +133,9 @@ def select_etf():
     print("-"*60)
 
     etf_list = []
-    for i, etf in enumerate(['ARKF', 'ARKG', 'ARKK', 'ARKQ', 'ARKW', 'ARKX'], 1):
+    for i, etf in enumerate(data_config.ETF_FUNDS, 1):
         if etf in available:
-            selected = '►' if etf == SELECTED_ETF else ' '
+            selected = '►' if etf == data_config.SELECTED_ETF else ' '
             etf_list.append(etf)
             print(f"  [{selected}] {i}. {etf}: {available[etf]['path'].name}")
         else:
@@ -138,10 +155,8 @@ def select_etf():
         print("Selection cancelled")
         return False
 
-    etf_map = {'1': 'ARKF', '2': 'ARKG', '3': 'ARKK', '4': 'ARKQ', '5': 'ARKW', '6': 'ARKX'}
-
-    if choice in etf_map:
-        selected_etf = etf_map[choice]
+    if choice in _ETF_CHOICE_MAP:
+        selected_etf = _ETF_CHOICE_MAP[choice]
         if selected_etf in available:
             set_selected_etf(selected_etf)
             create_directories()  # Create directories for this ETF
@@ -156,7 +171,7 @@ def select_etf():
         return False
 
 def run_module(module_name, description):
-    """Run a specific module"""
+    """Run a specific module; returns False if it raised"""
     weight_label = CURRENT_RANGE['label'] if CURRENT_RANGE else 'All'
     print(f"\n▶ Running: {description} [{weight_label}]")
     print("-"*40)
@@ -173,42 +188,97 @@ def run_module(module_name, description):
             module.main()
         else:
             print(f"⚠️  Module {module_name} has no run() or main() function")
+        return True
     except Exception as e:
         print(f"❌ Error running {module_name}: {e}")
         import traceback
         traceback.print_exc()
+        return False
 
 def run_all_modules():
-    """Run all analysis modules for current weight range"""
+    """Run all analysis modules for current weight range; returns False if any failed"""
     weight_label = CURRENT_RANGE['label'] if CURRENT_RANGE else '<1%'
     print(f"\n🚀 Running all analysis steps for {weight_label} positions...")
     
-    for key in sorted(modules.keys()):
+    failed = []
+    for key in _SORTED_MODULE_KEYS:
         module_name, description = modules[key]
-        run_module(module_name, description)
+        if not run_module(module_name, description):
+            failed.append(module_name)
     
+    if failed:
+        print(f"\n❌ {len(failed)} step(s) failed for {weight_label}: {', '.join(failed)}")
+        return False
     print(f"\n✅ All steps completed for {weight_label}!")
+    return True
+
+def _run_range_worker(etf_name, range_config):
+    """
+    Run all modules for one weight range inside a worker process
+    
+    Returns:
+        (succeeded, output) - output is everything the range printed, captured
+        so the parent can print each range's log whole instead of interleaved
+    """
+    from data_config import get_available_etf_files, set_selected_etf
+    
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        try:
+            # Worker processes start with fresh config, so restore the selection
+            get_available_etf_files()
+            set_selected_etf(etf_name)
+            
+            print(f"\n\n{'='*60}")
+            print(f"Processing Range: {range_config['label']}")
+            print(f"{'='*60}")
+            
+            # Set current range
+            set_current_range(range_config)
+            create_directories()
+            
+            # Run all modules for this range
+            succeeded = run_all_modules()
+        except Exception as e:
+            print(f"❌ Error setting up range {range_config['label']}: {e}")
+            import traceback
+            traceback.print_exc()
+            succeeded = False
+    
+    return succeeded, output.getvalue()
+
+def _run_range_worker_args(args):
+    """Unpack an (etf_name, range_config) pair for Pool.imap"""
+    return _run_range_worker(*args)
 
 def batch_run_all_ranges():
     """Run all modules for all weight ranges"""
+    
     print("\n" + "="*60)
     print("BATCH PROCESSING ALL WEIGHT RANGES")
     print("="*60)
     
-    for range_config in WEIGHT_RANGES:
-        print(f"\n\n{'='*60}")
-        print(f"Processing Range: {range_config['label']}")
-        print(f"{'='*60}")
-        
-        # Set current range
-        set_current_range(range_config)
-        create_directories()
-        
-        # Run all modules for this range
-        run_all_modules()
+    # Weight ranges write to separate folders, so process them in parallel.
+    # Use spawn so every worker imports matplotlib and the modules afresh.
+    # Parse the workbook once here so every worker reads the warm on-disk
+    # cache instead of all of them parsing the same Excel file at once
+    data_config.load_etf(data_config.SELECTED_ETF, columns=['Date'])
+    
+    n_workers = min(len(WEIGHT_RANGES), os.cpu_count() or 1)
+    failed_ranges = []
+    with mp.get_context('spawn').Pool(n_workers) as pool:
+        results = pool.imap(_run_range_worker_args, [(data_config.SELECTED_ETF, r) for r in WEIGHT_RANGES])
+        # Print each range's log, in range order, as soon as it has finished
+        for range_config, (succeeded, output) in zip(WEIGHT_RANGES, results):
+            print(output, end='', flush=True)
+            if not succeeded:
+                failed_ranges.append(range_config['label'])
     
     print("\n" + "="*60)
-    print("✅ ALL WEIGHT RANGES PROCESSED SUCCESSFULLY!")
+    if failed_ranges:
+        print(f"❌ {len(failed_ranges)} WEIGHT RANGE(S) HAD FAILURES: {', '.join(failed_ranges)}")
+    else:
+        print("✅ ALL WEIGHT RANGES PROCESSED SUCCESSFULLY!")
     print("="*60)
     
     # Summary
@@ -242,7 +312,7 @@ def run_specific_module_all_ranges(module_key):
 
 def main():
     """Main menu system"""
-    from data_config import SELECTED_ETF
+    global ALL_RANGES_MODE
 
     # Set default to first weight range initially
     if not CURRENT_RANGE:
@@ -258,8 +328,7 @@ def main():
             
         elif choice == 'A':
             # Check if ETF is selected
-            from data_config import SELECTED_ETF
-            if not SELECTED_ETF:
+            if not data_config.SELECTED_ETF:
                 print("❌ Please select an ETF first (option E)")
                 continue
             # Run all steps for current range
@@ -267,8 +336,7 @@ def main():
 
         elif choice == 'B':
             # Check if ETF is selected
-            from data_config import SELECTED_ETF
-            if not SELECTED_ETF:
+            if not data_config.SELECTED_ETF:
                 print("❌ Please select an ETF first (option E)")
                 continue
             # Batch run for all ranges
@@ -279,11 +347,11 @@ def main():
             result = select_weight_range()
             if result == 'ALL_RANGES':
                 # Set a special marker for all ranges mode
-                # We'll use a global variable to track this without modifying CURRENT_RANGE
-                globals()['ALL_RANGES_MODE'] = True
+                # Tracked in the module-level flag so CURRENT_RANGE is left unchanged
+                ALL_RANGES_MODE = True
                 print("✅ Set to ALL RANGES mode - now select which step(s) to run")
             elif result and result != False:
-                globals()['ALL_RANGES_MODE'] = False  # Clear all ranges mode
+                ALL_RANGES_MODE = False  # Clear all ranges mode
                 print(f"✅ Weight range set to: {result['label']}")
         
         elif choice == 'E':
@@ -292,16 +360,15 @@ def main():
                 
         elif choice in modules:
             # Check if ETF is selected
-            from data_config import SELECTED_ETF
-            if not SELECTED_ETF:
+            if not data_config.SELECTED_ETF:
                 print("❌ Please select an ETF first (option E)")
                 continue
             # Check if we're in all ranges mode
-            if globals().get('ALL_RANGES_MODE', False):
+            if ALL_RANGES_MODE:
                 # In all ranges mode, directly run for all ranges
                 run_specific_module_all_ranges(choice)
                 # Clear the all ranges mode flag
-                globals()['ALL_RANGES_MODE'] = False
+                ALL_RANGES_MODE = False
             else:
                 # Ask if user wants to run for current range or all ranges
                 print(f"\nRun '{modules[choice][1]}' for:")
@@ -331,15 +398,18 @@ def main():
                 else:
                     print(f"⚠️  Invalid choice: {c}")
             
+            # Run each step once, in the order first entered (e.g. "1,1,2" runs 1 then 2)
+            valid_choices = list(dict.fromkeys(valid_choices))
+            
             if valid_choices:
                 # Check if we're in all ranges mode
-                if globals().get('ALL_RANGES_MODE', False):
+                if ALL_RANGES_MODE:
                     # In all ranges mode, directly run for all ranges
                     for c in valid_choices:
                         run_specific_module_all_ranges(c)
                     print("\n✅ Selected steps completed for all ranges!")
                     # Clear the all ranges mode flag
-                    globals()['ALL_RANGES_MODE'] = False
+                    ALL_RANGES_MODE = False
                 else:
                     # Ask if user wants to run for current range or all ranges
                     print(f"\nRun selected modules for:")